@@ -1,12 +1,13 @@
 SOURCES := $(wildcard *.html) default.css
 
-build/%.d : % | build ; python tools/deps.py -o $@ -TDa $<
+# One scan for all sources; build/deps.json skips the unchanged ones.
+build/deps.mk : $(SOURCES) | build ; python tools/deps.py -TDa -c build/deps.json -M $@ $(SOURCES)
 
-include $(SOURCES:%=build/%.d)
+include build/deps.mk
 
 dist/aktuelles.html : content/news.txt
-dist/scheinescanner.html : dist/vendor/nimiq/qr-scanner.umd.min.js
-dist/scheinescanner.html : dist/vendor/nimiq/qr-scanner-worker.min.js
+dist/scheinescanner.html batch : dist/vendor/nimiq/qr-scanner.umd.min.js
+dist/scheinescanner.html batch : dist/vendor/nimiq/qr-scanner-worker.min.js
 
 # HACKS
 
@@ -45,6 +45,12 @@ $(info $(MISC))
 
 all : $(HTML) $(MISC) dist/VERSION
 
+# Same as `all` but renders every page in a single render.py process.
+.PHONY : batch
+BATCH := $(foreach h,$(HTML),$(if $(filter $h,$(VEREINSTURNIERE)),$(h:dist/%=build/%),$(h:dist/%=%)) $h)
+batch : $(VEREINSTURNIERE:dist/%=build/%) $(MISC) dist/VERSION | dist
+	@printf '%s %s\n' $(BATCH) | $(RENDER) --batch -
+
 .PHONY : x-html x-misc
 x-html : ; @python -c 'print("\n".join("$(HTML)".split()))'
 x-misc : ; @python -c 'print("\n".join("$(MISC)".split()))'
@@ -39,24 +39,26 @@ def parse_args(args = sys.argv[1:]):
 
 def listCsvFilePaths(printTypes = False, parsePaths = False, justNames = False, sortEm = False, reverseSort = False):
 	from tools.lib import fs
+	from tools.lib.Catalog import Catalog
 
 	nn = []
 
-	for n in fs.list('src', 'tables'):
+	for e in Catalog.open(fs.path('src', 'tables'), refresh = True):
+		n = e.path
 
 		pt = 0
 		fts = ""
 		pts = ""
 
 		if parsePaths:
-			pt = fs.ptype(n)
+			pt = e.ptype
 			if pt:
 				pts = f'{pt.year}-{pt.month} / {pt.type}\t'
 			else:
 				pts = '*\t'
 
 		if printTypes:
-			fts = f"{fs.ftype(n) or '*':>12s}\t"
+			fts = f"{e.type or '*':>12s}\t"
 
 		if justNames:
 			_, n = os.path.split(n)
@@ -74,14 +76,13 @@ def listCsvFilePaths(printTypes = False, parsePaths = False, justNames = False,
 
 def findCsvFilePaths(year = None, month = None, csvType = None, parsePaths = False, justNames = False, sortEm = False, reverseSort = False):
 	from tools.lib import fs
+	from tools.lib.Catalog import Catalog
 
 	nn = []
 
-	for n in fs.list('src', 'tables'):
-		t = fs.ptype(n)
-		if year is not None and not year == t.year: continue
-		if month is not None and not month == t.month: continue
-		if csvType is not None and not csvType == t.type: continue
+	catalog = Catalog.open(fs.path('src', 'tables'), refresh = True)
+	for e in catalog.find(year, month, csvType):
+		t, n = e.ptype, e.path
 		if justNames: _, n = os.path.split(n)
 		nn.append((t, n))
 
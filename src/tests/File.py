@@ -38,6 +38,20 @@ def test2():
 	#~ for p in f.players(): print(p)
 
 
+def test3():
+	from lib.File import File
+
+	# Ranks are memoised; an edit in place needs invalidate().
+	f = File(init.path(__file__, "src", "tables/schnell-23-02.csv"))
+	before = f.pscores()
+	f.rows[0][f.points_column_index()] = "0"
+	assert f.pscores() == before
+	f.invalidate()
+	assert f.pscores() == [0.0] + before[1:], f.pscores()
+	print("ranks  ", f.ranks())
+
+
 if __name__ == "__main__":
 	#~ test1()
 	test2()
+	test3()
@@ -0,0 +1,29 @@
+import io, re, sys
+
+import init
+
+from tools import csv2table
+
+# Tie-break columns of a #NPR table (rounds, no crosstable), checked
+#	against the rounds: "6w1" is a win against the player in row 6.
+
+path = init.path(__file__, "src", "tables/schnell-23-06-table.csv")
+rows = []
+with open(path, encoding="utf-8") as file:
+	next(file)
+	for line in file:
+		cells = line.split()
+		if cells: rows.append(cells)
+points = [float(row[-6]) for row in rows]
+results = [[re.fullmatch(r"(\d+)[wsb](.*)", c).groups() for c in row[-5:]] for row in rows]
+expected = [[points[int(o) - 1] for o, s in rr] for rr in results]
+expected = [(sum(bb), sum(1 for o, s in rr if s == "1")) for bb, rr in zip(expected, results)]
+
+out = io.StringIO()
+csv2table.csv2table(path, o=out, tiebreaks=["buchholz", "wins"])
+cells = re.findall(r'<td class="tiebreak">(.*?)</td>', out.getvalue())
+got = [(float(cells[i]), int(cells[i + 1])) for i in range(0, len(cells), 2)]
+
+for row, e, g in zip(rows, expected, got):
+	print("%-20s %s %s" % (" ".join(row[1:-6]), e, "" if e == g else "GOT %s" % (g,)))
+sys.exit(0 if got == expected else 1)
@@ -13,16 +13,15 @@ def main():
 		print(p)
 		print()
 
-		lines = lib.fs.lines(p)
-
-		sig = lib.fs.signature(lines)
-		if not sig.istournament: continue
-		print(sig)
-		print()
-
-		for line in lines:
-			print(line)
-		print()
+		with lib.fs.probe(p) as probe:
+			sig = probe.signature
+			if not sig.istournament: continue
+			print(sig)
+			print()
+
+			for line in probe.lines():
+				print(line)
+			print()
 
 if __name__ == "__main__":
 	sys.exit(main())
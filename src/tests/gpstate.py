@@ -0,0 +1,45 @@
+import io, os, sys, tempfile
+from contextlib import redirect_stdout
+
+import init
+
+from tools import gp
+
+from lib.CsvTablePath import CsvTablePath
+
+# `gp.py -s -c` of a full rebuild, and with a --state file (cold and warm),
+#	is the same as before History could be updated incrementally.
+
+def run(*args):
+	out = io.StringIO()
+	with redirect_stdout(out):
+		gp.main(["gp.py"] + list(args))
+	return out.getvalue()
+
+bad = 0
+with tempfile.TemporaryDirectory() as tmp:
+	for index in ("gp-22-08", "gp-23-01"):
+		with open(init.path(__file__, "src", "tests/expected/%s-sc.html" % index), encoding="utf-8") as file:
+			expected = file.read()
+		indexpath = init.path(__file__, "src", "tables/%s.csv" % index)
+		state = os.path.join(tmp, index + ".json")
+		for kind, args in (
+			("full", ["-s", "-c", "-i", indexpath]),
+			("cold", ["-s", "-c", "-i", indexpath, "--state", state]),
+			("warm", ["-s", "-c", "-i", indexpath, "--state", state]),
+		):
+			same = run(*args) == expected
+			if not same: bad += 1
+			print(index, kind, "same" if same else "DIFFERENT")
+
+		# A table that changed on disk (here: only its mtime) is read again;
+		#	the result is still that of a history built from scratch.
+		for path in CsvTablePath.fromIndexFile(indexpath):
+			st = os.stat(path.path)
+			os.utime(path.path, ns=(st.st_atime_ns, st.st_mtime_ns + 1000))
+			try: same = run("-s", "-c", "-i", indexpath, "--state", state) == expected
+			finally: os.utime(path.path, ns=(st.st_atime_ns, st.st_mtime_ns))
+			if not same: bad += 1
+			print(index, "touched", os.path.basename(path.path), "same" if same else "DIFFERENT")
+
+sys.exit(1 if bad else 0)
@@ -0,0 +1,69 @@
+import sys, re, time, random
+
+import init
+import lib.fs
+from lib.header import htype
+
+# The regex cascade lib.header replaced, as a reference.
+CASCADE = [
+	("^#,\s*Name(,\s*\d+)+,\s*Punkte,\s*Platz$", "#NPP"),
+	("^#\t+Name(\t+\d+)+\t+Punkte\t+Platz$", "t/#NPP"),
+	("^#,\s*Name(,\s*\d+)+,\s*Punkte$", "#NP"),
+	("^#\t+Name(\t+\d+)+\t+Punkte$", "t/#NP"),
+	("^#,\s*Name(,\s*\d+)+$", "#N"),
+	("^#\t+Name(\t+\d+)+$", "t/#N"),
+	("^#,\s*x\s*=\s*(,\s*\d+)+$", "#X"),
+	("^#\t+x\s*=\s*(\t+\d+)+$", "t/#X"),
+	("^Runde,\s*Weiss,\s*Schwarz,\s*Ergebnis$", "RWSE"),
+	("^Runde\t+Weiss\t+Schwarz\t+Ergebnis$", "t/RWSE"),
+	("^#,\s*Name,\s*G,\s*S,\s*R,\s*V,\s*Punkte,\s*Buchh,\s*Soberg$", "#NGSRVPBS"),
+	("^#\t+Name\t+G\t+S\t+R\t+V\t+Punkte\t+Buchh\t+Soberg$", "t/#NGSRVPBS"),
+	("^#,\s*Name,\s*Punkte(,\s*R\d+)+$", "#NPR"),
+	("^#\t+Name\t+Punkte(\t+R\d+)+$", "t/#NPR"),
+]
+
+def cascade(text):
+	text = text.strip()
+	for pattern, t in CASCADE:
+		if re.match(pattern, text):
+			return t
+
+def corpus(n, seed=1):
+	"""Real headers from tables/ and mutations of them."""
+	headers = [lib.fs.lines(p)[0] for p in lib.fs.list("src", "tables") if p.endswith(".csv")]
+	headers += ["#,x =,1,2,3", "#\tx\t=\t1\t2", "#,Name,Punkte,R1,R2,R3", "#\tName\tPunkte\tR1"]
+	rnd = random.Random(seed)
+	noise = [",", "\t", " ", "\t\t", ", ", "1", "R", "x", "=", "#", ""]
+	out = []
+	for i in range(n):
+		h = list(rnd.choice(headers))
+		for j in range(rnd.choice([0, 0, 1, 2])):
+			k = rnd.randrange(len(h) + 1)
+			h[k:k + rnd.choice([0, 1])] = rnd.choice(noise)
+		out.append("".join(h))
+	return out
+
+def bench(f, texts, repeat=3):
+	best = None
+	for i in range(repeat):
+		t = time.perf_counter()
+		for text in texts: f(text)
+		t = time.perf_counter() - t
+		best = t if best is None else min(best, t)
+	return best
+
+def main():
+	texts = corpus(50000)
+
+	bad = [t for t in texts if htype(t) != cascade(t)]
+	for t in bad[:10]:
+		print("MISMATCH %r: %r != %r" % (t, htype(t), cascade(t)))
+	print("%d headers, %d mismatches" % (len(texts), len(bad)))
+
+	t1 = bench(cascade, texts)
+	t2 = bench(htype, texts)
+	print("cascade %.3fs, htype %.3fs, %.1fx" % (t1, t2, t1 / t2))
+	return 1 if bad else 0
+
+if __name__ == "__main__":
+	sys.exit(main())
@@ -0,0 +1,63 @@
+import sys, time, random
+from array import array
+
+import init
+from lib.ranking import ranking
+
+# How File.ranks ranked before lib.ranking, as a reference: points and
+#	tiebreaks packed into one float, then a sort and a scan.
+def packed(points, buchholz = None, soberg = None, shift = 100):
+	ss = list(points)
+	if buchholz is not None:
+		ss = [p * shift * shift + bu * shift + so * shift for p, bu, so in zip(points, buchholz, soberg)]
+	ranks = sorted(enumerate(ss), reverse = True, key = lambda x: x[1])
+	last = None
+	rank = 0
+	for index, (rowindex, score) in enumerate(ranks):
+		if score != last:
+			last = score
+			rank = index + 1
+		ranks[index] = (rowindex, rank)
+	return ranks
+
+def table(n, rnd):
+	"""Swiss-like score columns for `n` players."""
+	rounds = max(1, n.bit_length() + 2)
+	points = array("d", (rnd.randrange(2 * rounds + 1) / 2 for i in range(n)))
+	buchholz = array("d", (rnd.randrange(4 * rounds * rounds + 1) / 2 for i in range(n)))
+	soberg = array("d", (rnd.randrange(4 * rounds * rounds + 1) / 4 for i in range(n)))
+	return points, buchholz, soberg
+
+def bench(f, tables, repeat=3):
+	best = None
+	for i in range(repeat):
+		t = time.perf_counter()
+		for keys in tables: f(*keys)
+		t = time.perf_counter() - t
+		best = t if best is None else min(best, t)
+	return best
+
+def main():
+	rnd = random.Random(1)
+	bad = 0
+	for n in (10, 100, 1000, 10000):
+		tables = [table(n, rnd) for i in range(max(1, 10000 // n))]
+		differ = sum(1 for keys in tables if packed(*keys) != ranking(keys))
+		# Exact ranks: sorted by every key in turn, ties only on equal keys.
+		for keys in tables:
+			rows = list(zip(*keys))
+			pairs = ranking(keys)
+			for (i, r), (j, s) in zip(pairs, pairs[1:]):
+				if rows[i] < rows[j] or (rows[i] == rows[j]) != (r == s): bad += 1
+		t1 = bench(packed, tables)
+		t2 = bench(lambda *keys: ranking(keys), tables)
+		# Tables without tiebreak columns (#NP) rank by points alone.
+		t3 = bench(lambda p, bu, so: packed(p), tables)
+		t4 = bench(lambda p, bu, so: ranking([p]), tables)
+		print("%5d players x %4d tables: packed %.3fs, ranking %.3fs (points only %.3fs, %.3fs), %d tables ranked differently" % (
+			n, len(tables), t1, t2, t3, t4, differ))
+	print("%d wrong ranks" % bad)
+	return 1 if bad else 0
+
+if __name__ == "__main__":
+	sys.exit(main())
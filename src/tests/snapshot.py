@@ -0,0 +1,32 @@
+import os, sys, tempfile
+
+import init
+
+from lib import snapshot
+
+# A snapshot cut short anywhere (an interrupted copy, a full disk) is
+#	rebuilt by load(), not read.
+
+tdir = init.path(__file__, "src", "tables")
+probe = os.path.join(tdir, "blitz-23-01.csv")
+
+bad = 0
+with tempfile.TemporaryDirectory() as tmp:
+	path = os.path.join(tmp, "tables.snapshot")
+	snapshot.compile(tdir, path)
+	with open(path, "rb") as file:
+		data = file.read()
+	for size in (0, 4, snapshot.HEADER.size - 1, snapshot.HEADER.size + 10, len(data) // 2, len(data) - 8):
+		with open(path, "wb") as file:
+			file.write(data[:size])
+		try:
+			snapshot.load(path, tdir)
+			ok = os.path.getsize(path) == len(data) and snapshot.lookup(probe) is not None
+		except Exception as e:
+			ok = False
+			print(type(e).__name__, e)
+		if not ok: bad += 1
+		print("%6d of %d bytes: %s" % (size, len(data), "rebuilt" if ok else "FAILED"))
+	snapshot.active = None
+
+sys.exit(1 if bad else 0)
@@ -0,0 +1,198 @@
+"""Builds dist/ like `make all`, in one Python process plus a worker pool.
+
+Every target remembers the hashes of its inputs in build/build.json: the
+source page, the paths deps.py finds in it, the tool sources and every
+file or directory the renderer actually read (recorded by cache.Recorder).
+A target is rebuilt only if it is missing or one of those changed.
+
+The vereinsturniere years are taken from tables/ directly, so the
+`VEREINSTURNIERE := 22 23 24` workaround in main.mk does not apply here.
+"""
+
+import sys, os, glob, json, shutil, hashlib, argparse
+import concurrent.futures
+
+import tools, cache, deps, render, vereinsturniere
+
+DIR_DIST = deps.DIR_DIST
+DIR_BUILD = deps.DIR_BUILD
+
+class Target:
+	def __init__(self, dst, src, kind, extra=()):
+		self.dst = dst
+		self.src = src
+		self.kind = kind
+		self.extra = list(extra)
+
+	def __repr__(self):
+		return "%s(%s <- %s)" % (self.kind, self.dst, self.src)
+
+def parse_args(args=None):
+	p = argparse.ArgumentParser()
+	p.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1)
+	p.add_argument("-n", "--dry-run", action="store_true", help="only list what is out of date")
+	p.add_argument("-B", "--always-make", action="store_true", help="rebuild every target")
+	p.add_argument("--state", default=os.path.join(DIR_BUILD, "build.json"))
+	p.add_argument("--no-cache", action="store_true", help="pass --no-cache to render.py")
+	p.add_argument("--vendor", action="store_true", help="copy vendor/ (VENDOR=1)")
+	p.add_argument("--learning", action="store_true", help="copy learning/ (LEARNING=1)")
+	p.add_argument("--no-rewe", action="store_true", help="skip the REWE scanner (REWE=0)")
+	return p, p.parse_args(args)
+
+def tree(path):
+	for t, dd, nn in os.walk(path):
+		dd.sort()
+		for n in sorted(nn):
+			yield os.path.join(t, n)
+
+def years():
+	aa = argparse.Namespace(tdir="tables")
+	return sorted(vereinsturniere.find_years(aa))
+
+def discover(aa):
+	"""The same targets as `all` in main.mk (and deps.mk's extra copies)."""
+	tt = []
+
+	pages = sorted(glob.glob("*.html")) + ["default.css"]
+	if aa.no_rewe: pages.remove("scheinescanner.html")
+	for page in pages:
+		tt.append(Target(os.path.join(DIR_DIST, page), page, "render"))
+
+	for year in years():
+		name = "vereinsturniere-%d.html" % year
+		tt.append(Target(os.path.join(DIR_BUILD, name), None, "year", [year]))
+		tt.append(Target(os.path.join(DIR_DIST, name), os.path.join(DIR_BUILD, name), "render"))
+
+	misc = ["favicon.ico"] + list(tree("img")) + list(tree("downloads"))
+	misc.append("vendor/github.svg")
+	if aa.learning: misc.extend(tree("learning"))
+	if aa.vendor: misc.extend(tree("vendor"))
+	if not aa.no_rewe:
+		misc.extend(sorted(glob.glob("vendor/rewe/img/*.png")))
+		misc.extend(["vendor/nimiq/qr-scanner.umd.min.js", "vendor/nimiq/qr-scanner-worker.min.js"])
+	for path in dict.fromkeys(misc):
+		tt.append(Target(os.path.join(DIR_DIST, path), path, "copy"))
+
+	tt.append(Target(os.path.join(DIR_DIST, "VERSION"), os.path.join("..", "VERSION"), "copy"))
+	return tt
+
+def static_deps(target):
+	if target.kind == "copy": return [target.src]
+	if target.kind == "year": return []
+	dd = deps.findDeps(argparse.Namespace(src=target.src, all=True, strict=False))
+	# HACKS carried over from deps.mk.
+	if target.src == "aktuelles.html": dd.append("content/news.txt")
+	if target.src == "default.css": dd.append("vendor/github.svg")
+	tdir = os.path.dirname(os.path.abspath(tools.__file__))
+	code = sorted(glob.glob(os.path.join(tdir, "*.py")) + glob.glob(os.path.join(tdir, "lib", "*.py")))
+	return [target.src] + dd + [os.path.relpath(p) for p in code]
+
+class Hasher:
+	def __init__(self):
+		self.memo = {}
+
+	def __call__(self, path):
+		if path not in self.memo:
+			self.memo[path] = self.hash(path)
+		return self.memo[path]
+
+	@classmethod
+	def hash(cls, path):
+		h = hashlib.sha256()
+		if path.startswith(cache.GLOB):
+			h.update("\n".join(cache.stat(path)).encode("utf-8"))
+		elif os.path.isdir(path):
+			h.update("\n".join(sorted(os.listdir(path))).encode("utf-8"))
+		elif os.path.isfile(path):
+			with open(path, "rb") as file:
+				for block in iter(lambda: file.read(1 << 16), b""):
+					h.update(block)
+		else:
+			return None
+		return h.hexdigest()
+
+def load_state(path):
+	try:
+		with open(path, encoding="utf-8") as file:
+			return json.load(file)
+	except (OSError, ValueError):
+		return {}
+
+def save_state(path, state):
+	os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+	with tools.oopen(path, force=True) as file:
+		json.dump(state, file, indent="\t", sort_keys=True)
+
+def outdated(target, state, hasher):
+	if not os.path.exists(target.dst): return True
+	inputs = state.get(target.dst)
+	if inputs is None: return True
+	return any(hasher(p) != h for p, h in inputs.items())
+
+def relevant(path):
+	if path.startswith(cache.GLOB): return path
+	path = os.path.relpath(path)
+	if path == DIR_DIST or path.startswith(DIR_DIST + os.sep): return None
+	return path
+
+def build(target, no_cache=False):
+	"""Builds one target and returns the paths it read."""
+	odir = os.path.dirname(target.dst)
+	if odir: os.makedirs(odir, exist_ok=True)
+	with cache.Recorder() as r:
+		if target.kind == "copy":
+			shutil.copyfile(target.src, target.dst)
+		elif target.kind == "year":
+			vereinsturniere.main(["vereinsturniere.py", "--tdir", "tables", "--pdir", ".",
+				"--year-from-path", target.dst, "--ofile", target.dst])
+		else:
+			argv = ["render.py", "-o", target.dst, target.src]
+			if no_cache: argv.insert(1, "--no-cache")
+			render.main(argv)
+	return [p for p in (relevant(p) for p in r.deps) if p]
+
+def run(aa, tt, state, pool):
+	hasher = Hasher()
+	todo = [t for t in tt if aa.always_make or outdated(t, state, hasher)]
+	if aa.dry_run:
+		for t in todo: print(t.dst)
+		return 0
+	failed = 0
+	futures = {}
+	for t in todo:
+		if pool: futures[t] = pool.submit(build, t, aa.no_cache)
+		else:
+			futures[t] = concurrent.futures.Future()
+			try: futures[t].set_result(build(t, aa.no_cache))
+			except Exception as e: futures[t].set_exception(e)
+	hasher = Hasher()
+	for t, f in futures.items():
+		try: read = f.result()
+		except Exception as e:
+			print("build: %s: %s" % (t.dst, e), file=sys.stderr)
+			state.pop(t.dst, None)
+			failed += 1
+			continue
+		print(t.dst)
+		inputs = dict.fromkeys(static_deps(t) + read)
+		inputs.pop(t.dst, None)
+		state[t.dst] = {p: hasher(p) for p in inputs}
+	return failed
+
+def main(argv=sys.argv):
+	p, aa = parse_args(argv[1:])
+	state = load_state(aa.state)
+	tt = discover(aa)
+	# The year pages have to exist before they can be rendered.
+	years = [t for t in tt if t.kind == "year"]
+	rest = [t for t in tt if t.kind != "year"]
+	failed = run(aa, years, state, None)
+	pool = concurrent.futures.ProcessPoolExecutor(aa.jobs) if aa.jobs > 1 and not aa.dry_run else None
+	try: failed += run(aa, rest, state, pool)
+	finally:
+		if pool: pool.shutdown()
+	if not aa.dry_run: save_state(aa.state, state)
+	return 1 if failed else 0
+
+if __name__ == "__main__":
+	sys.exit(main())
@@ -0,0 +1,308 @@
+import os, sys, json, glob, hashlib, contextlib, collections
+
+# Everything a cached block reads is recorded through an audit hook, so
+#	that tools which glob or list tables/ on their own (gp.py -i, meister.py,
+#	vereinsturniere.py --index) are invalidated as well. Blocks that shell
+#	out or write files are never stored. The hook is installed by the
+#	first Recorder; audit hooks cannot be removed again.
+
+recorders = []
+installed = False
+
+def hook(event, args):
+	if not recorders: return
+	if event == "open":
+		path, mode, flags = args
+		if isinstance(path, int) or path is None: return
+		path = os.fsdecode(path)
+		if path.endswith((".py", ".pyc")) or "__pycache__" in path: return
+		writes = (mode and any(c in mode for c in "wax+")) or \
+			(not mode and flags & (os.O_WRONLY | os.O_RDWR | os.O_CREAT))
+		for r in recorders:
+			if writes: r.tainted = True
+			else: r.add(path)
+	elif event in ("os.listdir", "os.scandir"):
+		path = args[0]
+		if isinstance(path, int): return
+		path = os.fsdecode(path) if path is not None else "."
+		for r in recorders: r.add(path)
+	elif event.startswith("glob.glob"):
+		# Recorded as the pattern, not its directory: a pattern without
+		#	wildcards is resolved by a plain lexists(), and most of the
+		#	globs look at the (busy) working directory.
+		pattern = GLOB + os.path.abspath(os.fsdecode(args[0]))
+		for r in recorders: r.add(pattern)
+
+def install():
+	global installed
+	if not installed:
+		sys.addaudithook(hook)
+		installed = True
+
+def taint():
+	for r in recorders:
+		r.tainted = True
+
+@contextlib.contextmanager
+def paused():
+	# The stores below read and write their own files while a block may be
+	#	recorded; those are bookkeeping, not inputs or side effects.
+	saved = recorders[:]
+	del recorders[:]
+	try: yield
+	finally: recorders[:] = saved
+
+def replay(tainted, deps):
+	# Feeds what a memoised call read (or that it shelled out) into the
+	#	recorders that are active now, as if it had run again.
+	for r in recorders:
+		if tainted: r.tainted = True
+		for path, st in deps.items():
+			r.deps.setdefault(path, st)
+
+# Nested renders (navbar, header, footer, ...) by argv, working directory
+#	and the hashes of the files named in argv; see render.include().
+partials = {}
+
+GLOB = "glob:"
+
+def stat(path):
+	if path.startswith(GLOB):
+		with paused():
+			return sorted(glob.glob(path[len(GLOB):]))
+	try: st = os.stat(path)
+	except OSError: return None
+	return [st.st_size, st.st_mtime_ns]
+
+class Recorder:
+	def __init__(self):
+		self.deps = {}
+		self.tainted = False
+
+	def add(self, path):
+		if not path.startswith(GLOB): path = os.path.abspath(path)
+		if path not in self.deps:
+			self.deps[path] = stat(path)
+
+	def __enter__(self):
+		install()
+		recorders.append(self)
+		return self
+
+	def __exit__(self, *aa):
+		recorders.remove(self)
+
+class Cache:
+	"""On-disk store for block outputs with a size cap and LRU eviction.
+
+	An entry is keyed by the command string, the working directory, the
+	tool sources and the files that `regex` finds in the command. It
+	also remembers every file the command actually read; a hit is only
+	served if none of them changed.
+	"""
+
+	def __init__(self, root, limit=64 * 1024 * 1024):
+		self.root = root
+		self.limit = limit
+		self.total = None
+		self._code = None
+
+	def code(self):
+		if self._code is None:
+			tdir = os.path.dirname(os.path.abspath(__file__))
+			pp = sorted(glob.glob(os.path.join(tdir, "*.py")) +
+				glob.glob(os.path.join(tdir, "lib", "*.py")))
+			self._code = [(p, stat(p)) for p in pp]
+		return self._code
+
+	def key(self, cmd, regex=None):
+		deps = sorted(set(m.group(1) for m in regex.finditer(cmd))) if regex else []
+		h = hashlib.sha256()
+		h.update(json.dumps([cmd, os.getcwd(), self.code(),
+			[(p, stat(p)) for p in deps]]).encode("utf-8"))
+		return h.hexdigest()
+
+	def path(self, key):
+		return os.path.join(self.root, key[:2], key + ".json")
+
+	def get(self, key):
+		with paused():
+			entry = self.read(key)
+		if entry is None: return None
+		replay(False, entry["deps"])
+		return entry["out"]
+
+	def read(self, key):
+		path = self.path(key)
+		try:
+			with open(path, encoding="utf-8") as file:
+				entry = json.load(file)
+		except (OSError, ValueError):
+			return None
+		for dep, st in entry["deps"].items():
+			if stat(dep) != st:
+				return None
+		try: os.utime(path)
+		except OSError: pass
+		return entry
+
+	def put(self, key, out, deps):
+		with paused():
+			self.write(key, out, deps)
+
+	def write(self, key, out, deps):
+		path = self.path(key)
+		os.makedirs(os.path.dirname(path), exist_ok=True)
+		tmp = "%s.%d.tmp" % (path, os.getpid())
+		with open(tmp, "w", encoding="utf-8") as file:
+			json.dump({"deps": deps, "out": out}, file)
+		old = os.path.getsize(path) if os.path.exists(path) else 0
+		os.replace(tmp, path)
+		if self.total is not None:
+			self.total += os.path.getsize(path) - old
+		self.evict()
+
+	def entries(self):
+		for path in glob.glob(os.path.join(self.root, "??", "*.json")):
+			try: st = os.stat(path)
+			except OSError: continue
+			yield st.st_mtime_ns, st.st_size, path
+
+	def evict(self):
+		if self.total is None:
+			self.total = sum(e[1] for e in self.entries())
+		if self.total <= self.limit: return
+		for mtime, size, path in sorted(self.entries()):
+			if self.total <= self.limit: break
+			try: os.remove(path)
+			except OSError: continue
+			self.total -= size
+
+	def clear(self):
+		for mtime, size, path in self.entries():
+			os.remove(path)
+		self.total = 0
+
+class Templates:
+	"""Compiled templates, keyed by a hash of the source text.
+
+	`compile` turns the text into a list of (key, chunk) pairs as yielded
+	by tools.rsplit. Results are kept in memory for the lifetime of the
+	process and, if `root` is set, as JSON files under `root`.
+	"""
+
+	def __init__(self, root=None):
+		self.root = root
+		self.memo = {}
+
+	def load(self, path, compile, salt=""):
+		with open(path, "rb") as file:
+			data = file.read()
+		h = hashlib.sha256(salt.encode("utf-8"))
+		h.update(data)
+		key = h.hexdigest()
+		if key not in self.memo:
+			with paused():
+				chunks = self.read(key)
+			if chunks is None:
+				# Same newline handling as open(path, encoding="utf-8").
+				text = data.decode("utf-8").replace("\r\n", "\n").replace("\r", "\n")
+				chunks = list(compile(text))
+				with paused():
+					self.write(key, chunks)
+			self.memo[key] = chunks
+		return self.memo[key]
+
+	def path(self, key):
+		return os.path.join(self.root, key + ".json")
+
+	def read(self, key):
+		if not self.root: return None
+		try:
+			with open(self.path(key), encoding="utf-8") as file:
+				chunks = json.load(file)
+		except (OSError, ValueError):
+			return None
+		return [(k, tuple(c) if k else c) for k, c in chunks]
+
+	def write(self, key, chunks):
+		if not self.root: return
+		path = self.path(key)
+		os.makedirs(self.root, exist_ok=True)
+		tmp = "%s.%d.tmp" % (path, os.getpid())
+		with open(tmp, "w", encoding="utf-8") as file:
+			json.dump(chunks, file)
+		os.replace(tmp, path)
+
+templates = Templates()
+
+class Tables:
+	"""Parsed tables by path, invalidated by size and mtime.
+
+	`parse` turns a path into something JSON can store. The last `size`
+	results are kept in memory for the lifetime of the process and, if
+	`root` is set, every result is also kept as a JSON file under `root`.
+	"""
+
+	def __init__(self, root=None, size=256):
+		self.root = root
+		self.size = size
+		self.memo = collections.OrderedDict()
+
+	def load(self, path, parse, kind=""):
+		path = os.path.abspath(path)
+		st = stat(path)
+		# A hit does not open the file, but the block still depends on it.
+		for r in recorders: r.add(path)
+		key = (kind, path)
+		if key in self.memo and self.memo[key][0] == st:
+			self.memo.move_to_end(key)
+			return self.memo[key][1]
+		with paused():
+			data = self.read(kind, path, st)
+		if data is None:
+			data = parse(path)
+			with paused():
+				self.write(kind, path, st, data)
+		self.memo[key] = (st, data)
+		self.memo.move_to_end(key)
+		while len(self.memo) > self.size:
+			self.memo.popitem(last=False)
+		return data
+
+	def put(self, path, data, kind="", st=None):
+		"""Stores what `parse` returned for `path` elsewhere (e.g. in a worker).
+
+		`st` is the stat taken before parsing; a file that changed since is
+		parsed again on the next `load`.
+		"""
+		path = os.path.abspath(path)
+		self.memo[(kind, path)] = (st, data)
+		self.memo.move_to_end((kind, path))
+		while len(self.memo) > self.size:
+			self.memo.popitem(last=False)
+
+	def path(self, kind, path):
+		h = hashlib.sha256(("%s:%s" % (kind, path)).encode("utf-8"))
+		return os.path.join(self.root, h.hexdigest() + ".json")
+
+	def read(self, kind, path, st):
+		if not self.root or st is None: return None
+		try:
+			with open(self.path(kind, path), encoding="utf-8") as file:
+				entry = json.load(file)
+		except (OSError, ValueError):
+			return None
+		if entry["stat"] != st: return None
+		return entry["data"]
+
+	def write(self, kind, path, st, data):
+		if not self.root or st is None: return
+		opath = self.path(kind, path)
+		os.makedirs(self.root, exist_ok=True)
+		tmp = "%s.%d.tmp" % (opath, os.getpid())
+		with open(tmp, "w", encoding="utf-8") as file:
+			json.dump({"path": path, "stat": st, "data": data}, file)
+		os.replace(tmp, opath)
+
+tables = Tables()
@@ -4,6 +4,18 @@ import re
 import sys
 
 import tables
+import lib.snapshot
+import lib.tool
+from lib.File import File
+
+# Tie-break columns csv2table can add, and their headings.
+TIEBREAKS = {
+	"buchholz": "Buchh",
+	"median": "MBuchh",
+	"soberg": "Soberg",
+	"wins": "Siege",
+	"direct": "DV",
+}
 
 def get_max_score_lengths(rr):
 	# FIXME: We want to run this only on the scores!
@@ -106,19 +118,39 @@ def isscorecol(rr, i):
 	return False
 
 
-def csv2table(inpath, o=sys.stdout, fractions=True, padding=False):
+def csv2table(inpath, o=sys.stdout, fractions=True, padding=False, tiebreaks=()):
+	tt = None
+	tabbed = False
 	try:
 		people, players, crosstable = tables.render(inpath)
-		rr = crosstable
 	except:
-		t = tables.determine_csv_type(inpath)
-		if t and t.startswith("t/"):
-			file = open(inpath, "r", encoding="utf-8")
-			lines = (tables.collapse_tabs(line.strip()) for line in file)
-			reader = csv.reader(lines)
+		players = None
+	if players:
+		rr = crosstable
+		if tiebreaks: tt = tables.tiebreaks(players)
+	else:
+		# Tables tables.render cannot cross (#NPR, ...) are shown as they are.
+		if tiebreaks:
+			# Tables without games get no tie-break columns.
+			try: tt = File(inpath).tiebreaks
+			except Exception: tt = None
+		table = lib.snapshot.lookup(inpath)
+		if table is not None:
+			header, t, rows = table
+			if t.startswith("t/"):
+				header = tables.collapse_tabs(header)
+			rr = [next(csv.reader([header]))] + rows
 		else:
-			reader = csv.reader(open(inpath, "r", encoding="utf-8"))
-		rr = [r for r in reader]
+			t = tables.determine_csv_type(inpath)
+			if t and t.startswith("t/"):
+				file = open(inpath, "r", encoding="utf-8")
+				lines = (tables.collapse_tabs(line.strip()) for line in file)
+				reader = csv.reader(lines)
+			else:
+				reader = csv.reader(open(inpath, "r", encoding="utf-8"))
+			rr = [r for r in reader]
+		# File drops the blank lines of these; the tie-breaks follow its rows.
+		tabbed = bool(t) and t.startswith("t/")
 
 	ilength, flength = get_max_score_lengths(rr)
 
@@ -128,7 +160,11 @@ def csv2table(inpath, o=sys.stdout, fractions=True, padding=False):
 	for c in rr[0]:
 		c = c.strip()
 		o.write("\t\t\t<th>%s</th>\n" % c)
+	if tt:
+		for key in tiebreaks:
+			o.write("\t\t\t<th>%s</th>\n" % TIEBREAKS[key])
 	o.write("\t\t</tr>\n\t</thead>\n\t<tbody>")
+	rid = 0
 	for r in rr[1:]:
 		o.write("\t\t<tr>\n")
 		for i, c in enumerate(r):
@@ -155,20 +191,38 @@ def csv2table(inpath, o=sys.stdout, fractions=True, padding=False):
 						c += "<br>"
 						c += normalize_score(b, ilength, flength, fractions, padding)
 			o.write("\t\t\t<td%s>%s</td>\n" % (attr, c))
+		if tt and (r or not tabbed):
+			for key in tiebreaks:
+				c = getattr(tt, key)[rid]
+				c = str(c) if isinstance(c, int) else lib.tool.ftos(c)
+				o.write('\t\t\t<td class="tiebreak">%s</td>\n' % c)
+			rid += 1
 		o.write("\t\t</tr>\n")
 	o.write("\t</tbody>\n</table>\n")
 
 
-if __name__ == "__main__":
+def main(argv=sys.argv):
 	p = argparse.ArgumentParser()
 	p.add_argument("file")
 	p.add_argument("--no-fractions", action="store_true")
 	#~ p.add_argument("--no-padding", action="store_true")
 	p.add_argument("--padding", action="store_true")
-	aa = p.parse_args(sys.argv[1:])
+	p.add_argument("--snapshot", metavar="PATH", help="read the tables from (and refresh) this snapshot")
+	p.add_argument("--tiebreaks", metavar="LIST", default="",
+		help="add tie-break columns, a comma-separated list of %s (e.g. buchholz,soberg)" % ", ".join(TIEBREAKS))
+	aa = p.parse_args(argv[1:])
 	#~ print(aa)
-	csv2table(aa.file,
+	tiebreaks = [t for t in aa.tiebreaks.split(",") if t]
+	for t in tiebreaks:
+		if t not in TIEBREAKS: p.error('unknown tie-break "%s"' % t)
+	if aa.snapshot: lib.snapshot.load(aa.snapshot)
+	csv2table(aa.file, o=sys.stdout,
 		fractions=not aa.no_fractions,
 		#~ padding=not aa.no_padding
-		padding=aa.padding
+		padding=aa.padding,
+		tiebreaks=tiebreaks
 	)
+
+
+if __name__ == "__main__":
+	main()
@@ -1,4 +1,4 @@
-import sys, os, re
+import sys, os, re, json, hashlib
 import argparse
 
 DIR_DIST = 'dist'
@@ -9,24 +9,64 @@ RE_BLOCK2 = re.compile(r'[{][{]\s*(.+?)\s*[}][}]', re.S)
 RE_DEPS1 = re.compile(r'((?:tables|content|css|tools|img)/\S+)', re.S)
 RE_DEPS2 = re.compile(r'((?:tables|content|css|tools)/\S+)', re.S)
 
-def iterBlocks(aa):
+def iterBlocks(aa, text=None):
 	RE_BLOCK = RE_BLOCK1 if aa.all else RE_BLOCK2
-	with open(aa.src) as file:
-		for m in RE_BLOCK.finditer(file.read()):
-			yield m.group(1) or m.group(2)
+	if text is None:
+		with open(aa.src) as file:
+			text = file.read()
+	for m in RE_BLOCK.finditer(text):
+		yield m.group(1) or m.group(2)
 
-def findDeps(aa):
+def findDeps(aa, text=None):
 	pp = set()
 	RE_DEPS = RE_DEPS1 if aa.all else RE_DEPS2
-	with open(aa.src) as file:
-		text = file.read()
-	for block in iterBlocks(aa):
+	for block in iterBlocks(aa, text):
 		for m in RE_DEPS.finditer(block):
 			p = m.group(1)
 			if not aa.strict or os.path.isfile(p):
 				pp.add(p)
 	return sorted(pp)
 
+class Scanner:
+	"""Finds the deps of many sources, reading each file once.
+
+	Results are kept in `state` (a JSON file) by source path together
+	with the hash of the source, so unchanged sources are not rescanned.
+	Strict scans depend on which files exist and are always redone.
+	"""
+
+	def __init__(self, state=None):
+		self.state = state
+		self.entries = {}
+		if state and os.path.isfile(state):
+			try:
+				with open(state) as file:
+					self.entries = json.load(file)
+			except ValueError:
+				pass
+		self.fresh = set()
+
+	def __call__(self, aa):
+		with open(aa.src, 'rb') as file:
+			data = file.read()
+		h = hashlib.sha256(data).hexdigest()
+		flags = [bool(aa.all), bool(aa.strict)]
+		entry = self.entries.get(aa.src)
+		if not aa.strict and entry and entry['hash'] == h and entry['flags'] == flags:
+			return entry['deps']
+		# Same newline handling as open(aa.src).
+		text = data.decode().replace('\r\n', '\n').replace('\r', '\n')
+		deps = findDeps(aa, text)
+		self.entries[aa.src] = {'hash': h, 'flags': flags, 'deps': deps}
+		self.fresh.add(aa.src)
+		return deps
+
+	def save(self):
+		if not self.state: return
+		os.makedirs(os.path.dirname(self.state) or '.', exist_ok=True)
+		with open(self.state, 'w') as file:
+			json.dump(self.entries, file, indent='\t', sort_keys=True)
+
 def preprocessNames(aa):
 	if aa.tname is None and aa.auto_tname:
 		aa.tname = os.path.join(DIR_DIST, aa.src)
@@ -41,8 +81,11 @@ def preprocessNames(aa):
 
 def parseArgs(args = sys.argv[1:]):
 	p = argparse.ArgumentParser()
-	p.add_argument('src', help='source file')
+	p.add_argument('src', nargs='+', help='source file(s)')
 	p.add_argument('-o', '--dst', help='destination file')
+	p.add_argument('-M', '--manifest', help='write the rules of all sources to this one file')
+	p.add_argument('-W', '--write-all', action='store_true', help='write each rule to its .d file (implies -T -D)')
+	p.add_argument('-c', '--state', help='remember the deps of unchanged sources in this file')
 
 	p.add_argument('-t', '--tname', help='rule target')
 	p.add_argument('-d', '--dname', help='rule target .d file')
@@ -55,12 +98,24 @@ def parseArgs(args = sys.argv[1:]):
 	p.add_argument('-r', '--replace-ext', action='store_true', help='replace extension rather than append')
 
 	aa = p.parse_args(args)
-	preprocessNames(aa)
+	if len(aa.src) > 1 and aa.dst:
+		p.error('-o takes a single source; use -M or -W for many')
+	if aa.write_all:
+		aa.auto_tname = aa.auto_dname = True
 
 	return p, aa
 
-def printDeps(aa, file = sys.stdout):
-	deps = findDeps(aa)
+def perSource(aa):
+	for src in aa.src:
+		a = argparse.Namespace(**vars(aa))
+		a.src = src
+		if aa.manifest:
+			a.dname = aa.manifest
+		preprocessNames(a)
+		yield a
+
+def printDeps(aa, file = sys.stdout, deps = None):
+	if deps is None: deps = findDeps(aa)
 	if not deps: return
 	if aa.tname is None:
 		for dep in deps:
@@ -87,11 +142,27 @@ def printDeps(aa, file = sys.stdout):
 def main(argv):
 	parser, aa = parseArgs(argv[1:])
 	# print(aa)
-	if aa.dst:
-		with open(aa.dst, 'w') as file:
-			printDeps(aa, file = file)
+	scan = Scanner(aa.state)
+	if aa.manifest:
+		with open(aa.manifest, 'w') as file:
+			for a in perSource(aa):
+				printDeps(a, file = file, deps = scan(a))
+				file.write('\n')
+	elif aa.write_all:
+		for a in perSource(aa):
+			deps = scan(a)
+			if os.path.isfile(a.dname) and a.src not in scan.fresh:
+				continue
+			with open(a.dname, 'w') as file:
+				printDeps(a, file = file, deps = deps)
 	else:
-		printDeps(aa)
+		for a in perSource(aa):
+			if aa.dst:
+				with open(aa.dst, 'w') as file:
+					printDeps(a, file = file, deps = scan(a))
+			else:
+				printDeps(a, deps = scan(a))
+	scan.save()
 
 if __name__ == '__main__':
 	sys.exit(main(sys.argv))
@@ -1,21 +1,16 @@
 import argparse, math, os, sys
 
-from lib.File import File
+from lib.File import File, Standings
 from lib.Names import Name, Synonyms, DEFAULT_SYNONYMS
 
 from lib.History import History
 from lib.CsvTablePath import CsvTablePath
 
-from lib import tool
+from lib import loader, ranking, snapshot, tool
 
 
-def load_names_from_files(filepaths):
-	names = []
-
-	for filepath in filepaths:
-		file = File(filepath)
-		#~ print(filepath, file.type, len(file.rows))
-		names.extend(Name.load(file))
+def load_names_from_files(filepaths, jobs = 1):
+	files, names = loader.load(filepaths, jobs)
 
 	synonyms = Synonyms(DEFAULT_SYNONYMS)
 	synonyms.classify_all(names)
@@ -26,29 +21,42 @@ def load_names_from_files(filepaths):
 
 def scores_from_file(file):
 	t = file.type
+	if t.endswith("RWSE"): return list(file.cooked.points)
 	if t.endswith("#NP"): cid = -1
 	elif t.endswith("#NGSRVPBS"): cid = -3
 	else: raise Exception("score column not found: unknown table")
-	return [float(row[cid]) for row in file.rows]
+	return list(file.columns.numbers(cid))
 
 
 def ranks_from_file(file, contiguous = False):
-	scores = scores_from_file(file)
-	scores = sorted(scores, reverse=True)
-	ranks = []
-	last = None
-	rank = 0
-	for index, score in enumerate(scores, start=1):
-		if score != last:
-			last = score
-			rank = rank + 1 if contiguous else index
-		ranks.append(rank)
-	#~ print(file.path, list(zip(scores, ranks)))
-	return ranks
+	return ranks_from_scores(scores_from_file(file), contiguous)
+
+
+def ranks_from_scores(scores, contiguous = False):
+	# In score order, best first.
+	return [r for i, r in ranking.ranking([scores], dense = contiguous)]
+
+
+def standings_from_file(file):
+	# Built once per file on top of the scoring pass History uses
+	#	(File.standings); gp_score and points_score only index into it.
+	#	points are in row order, as in File.standings. ranks and rscores
+	#	(the GP scores) are dense, by points alone and in score order, best
+	#	first, as they always were; the rows of these tables are in score
+	#	order, so gp_score indexes them by row as well.
+	def compute():
+		points = file.standings().points
+		ranks = ranks_from_scores(points, contiguous = True)
+		gps = gp_scores_from_ranks(list(ranks)) if len(ranks) > 1 else [10.0] * len(ranks)
+		return Standings(points, ranks, gps)
+	return file.memo(("gp",), compute)
 
 
 def gp_scores_from_file(file):
-	ranks = ranks_from_file(file, contiguous = True)
+	return list(standings_from_file(file).rscores)
+
+
+def gp_scores_from_ranks(ranks):
 	if len(ranks) == 0: return None
 	if len(ranks) == 1: return 10.0
 	j = ranks.index(2)
@@ -61,15 +69,13 @@ def gp_scores_from_file(file):
 
 
 def gp_score(name):
-	gps = gp_scores_from_file(name.fid.file)
 	rid = name.fid.id - 1	# header is not included in the rows
-	return gps[rid]
+	return standings_from_file(name.fid.file).rscores[rid]
 
 
 def points_score(name):
 	rid = name.fid.id - 1	# header is not included in the rows
-	scores = scores_from_file(name.fid.file)
-	return scores[rid]
+	return standings_from_file(name.fid.file).points[rid]
 
 
 def load_history(names, synonyms):
@@ -405,14 +411,19 @@ def print_cumulative_tournament_results_html(history, file=sys.stdout):
 
 	file.write('\t</tbody>\n</table>\n')
 
-if __name__ == "__main__":
+def main(argv=sys.argv):
 	parser = argparse.ArgumentParser()
 	parser.add_argument("-i", help="index file")
 	parser.add_argument("-s", action="store_true", help="single results")
 	parser.add_argument("-c", action="store_true", help="cumulative results")
-	aa = parser.parse_args(sys.argv[1:])
+	parser.add_argument("--snapshot", metavar="PATH", help="read the tables from (and refresh) this snapshot")
+	parser.add_argument("-j", "--jobs", metavar="N", type=int, default=1, help="parse the tables in N processes")
+	parser.add_argument("--state", metavar="PATH", help="keep the history in (and update it from) this file")
+	aa = parser.parse_args(argv[1:])
 	#~ print(aa)
 
+	if aa.snapshot: snapshot.load(aa.snapshot)
+
 	if not aa.i:
 		parser.error('need index file')
 	if not os.path.isfile(aa.i):
@@ -421,16 +432,19 @@ if __name__ == "__main__":
 	pp = CsvTablePath.fromIndexFile(aa.i)
 	#~ print(pp)
 
-	#~ filepaths = sys.argv[1:]
+	#~ filepaths = argv[1:]
 	#~ if not filepaths: exit()
 
 	filepaths = [p.path for p in pp]
 	#~ print(filepaths)
 
-	names, synonyms = load_names_from_files(filepaths)
-	#~ history = load_history(names, synonyms)
+	if aa.state:
+		his = History.open(aa.state, filepaths, Synonyms(DEFAULT_SYNONYMS), contiguous = False)
+	else:
+		names, synonyms = load_names_from_files(filepaths, aa.jobs)
+		#~ history = load_history(names, synonyms)
 
-	his = History(names, synonyms, contiguous = False)
+		his = History(names, synonyms, contiguous = False)
 
 	#~ print_names(names, synonyms)
 	#~ print_groups(names, synonyms)
@@ -443,5 +457,8 @@ if __name__ == "__main__":
 	#~ print_best_tournament_results_csv(history)
 	#~ print_cumulative_tournament_results_csv(history)
 
-	if aa.s: print_best_tournament_results_html(his)
-	if aa.c: print_cumulative_tournament_results_html(his)
+	if aa.s: print_best_tournament_results_html(his, file=sys.stdout)
+	if aa.c: print_cumulative_tournament_results_html(his, file=sys.stdout)
+
+if __name__ == "__main__":
+	main()
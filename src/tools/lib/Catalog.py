@@ -0,0 +1,130 @@
+import json, os
+
+from . import fs, store
+
+class Entry:
+	def __init__(self, path, size, mtime, signature, rows):
+		self.path = path
+		self.size = size
+		self.mtime = mtime
+		self.signature = fs.Signature(*signature)
+		self.rows = rows
+		self._ptype = False
+
+	@property
+	def name(self): return os.path.basename(self.path)
+
+	@property
+	def type(self): return self.signature.type or ""
+
+	@property
+	def ptype(self):
+		if self._ptype is False:
+			self._ptype = fs.ptype(self.path)
+		return self._ptype
+
+	@classmethod
+	def read(cls, path, st):
+		with fs.probe(path) as probe:
+			rows = sum(1 for line in probe.lines() if line)
+		return cls(path, st.st_size, st.st_mtime_ns, probe.signature, max(0, rows - 1))
+
+	def dump(self):
+		return [self.size, self.mtime, list(self.signature), self.rows]
+
+class Catalog:
+	"""The CSV files below `tdir`, with their type and row count.
+
+	`refresh` lists the directory with one os.scandir pass; only files
+	whose size or mtime changed are opened. The result is kept in the
+	`manifest` JSON file between runs.
+	"""
+
+	_open = {}
+
+	def __init__(self, tdir, manifest=None):
+		self.tdir = tdir
+		self.manifest = manifest
+		self.entries = {}
+		self.load()
+
+	@classmethod
+	def open(cls, tdir, refresh=False):
+		"""The catalog of `tdir`, scanned once per process (or on `refresh`)."""
+		key = os.path.abspath(tdir)
+		catalog = cls._open.get(key)
+		if catalog is None:
+			manifest = os.path.join(os.path.dirname(key), "build", "catalog.json")
+			catalog = cls._open[key] = cls(tdir, manifest)
+			refresh = True
+		if refresh:
+			catalog.refresh()
+		return catalog
+
+	def __iter__(self):
+		return iter(self.entries.values())
+
+	def __len__(self):
+		return len(self.entries)
+
+	def scan(self, path):
+		with os.scandir(path) as it:
+			for e in it:
+				if e.is_dir():
+					yield from self.scan(e.path)
+				elif e.name.endswith(".csv") and e.is_file():
+					yield e
+
+	def refresh(self):
+		old = self.entries
+		self.entries = {}
+		changed = False
+		for e in self.scan(self.tdir):
+			st = e.stat()
+			entry = old.get(e.path)
+			if entry is None or entry.size != st.st_size or entry.mtime != st.st_mtime_ns:
+				entry = Entry.read(e.path, st)
+				changed = True
+			self.entries[e.path] = entry
+		if changed or len(old) != len(self.entries):
+			self.save()
+		return self
+
+	def find(self, year=None, month=None, type=None, match=None):
+		"""Entries by year, month and/or table kind (blitz, gp, ...)."""
+		for entry in self:
+			if match and not match(entry.name): continue
+			if year is None and month is None and type is None:
+				yield entry
+				continue
+			p = entry.ptype
+			if not p: continue
+			if year is not None and p.year != year: continue
+			if month is not None and p.month != month: continue
+			if type is not None and p.type != type: continue
+			yield entry
+
+	def load(self):
+		if not self.manifest: return
+		with store.paused():
+			try:
+				with open(self.manifest, encoding="utf-8") as file:
+					data = json.load(file)
+			except (OSError, ValueError):
+				return
+		try:
+			for name, e in data.items():
+				path = os.path.join(self.tdir, name)
+				self.entries[path] = Entry(path, *e)
+		except (TypeError, ValueError):
+			self.entries = {}
+
+	def save(self):
+		if not self.manifest: return
+		data = {os.path.relpath(p, self.tdir): e.dump() for p, e in self.entries.items()}
+		with store.paused():
+			os.makedirs(os.path.dirname(self.manifest), exist_ok=True)
+			tmp = "%s.%d.tmp" % (self.manifest, os.getpid())
+			with open(tmp, "w", encoding="utf-8") as file:
+				json.dump(data, file, indent="\t")
+			os.replace(tmp, self.manifest)
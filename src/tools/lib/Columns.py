@@ -0,0 +1,85 @@
+from array import array
+
+# Where the columns of each table format are; negative indices count from
+#	the end of the row. "cross" is the [first, last) range of crosstable
+#	cells (None meaning up to the end of the row).
+LAYOUTS = {
+	"#NP": dict(ids=0, names=1, points=-1, cross=(2, -1)),
+	"#NPP": dict(ids=0, names=1, points=-2, ranks=-1, cross=(2, -2)),
+	"#N": dict(ids=0, names=1, cross=(2, None)),
+	"#X": dict(ids=0, names=1, cross=(2, None)),
+	"#NPR": dict(names=1, points=2, rounds=(3, None)),
+	"#NGSRVPBS": dict(ids=0, names=1, points=-3, buchholz=-2, soberg=-1),
+	"RWSE": dict(rounds=0, white=1, black=2, results=3),
+}
+
+class Columns:
+	"""Column-wise view of a table's rows.
+
+	Text columns are lists of strings, numeric columns `array('d')` and
+	crosstables a matrix of codes into a list of distinct cell texts.
+	Each column is converted once, the first time it is asked for.
+	"""
+
+	def __init__(self, format, rows):
+		self.format = format
+		self.layout = LAYOUTS.get(format, {})
+		self.rows = rows
+		self._columns = {}
+
+	def __len__(self):
+		return len(self.rows)
+
+	def strings(self, i):
+		key = ("s", i)
+		if key not in self._columns:
+			self._columns[key] = [row[i] for row in self.rows]
+		return self._columns[key]
+
+	def numbers(self, i):
+		key = ("d", i)
+		if key not in self._columns:
+			self._columns[key] = array("d", (float(row[i]) for row in self.rows))
+		return self._columns[key]
+
+	def matrix(self, first=None, last=None):
+		"""Returns (codes, symbols, width) for the cells in [first, last).
+
+		Row r, column c is `symbols[codes[r * width + c]]`.
+		"""
+		if first is None: first, last = self.layout["cross"]
+		key = ("m", first, last)
+		if key not in self._columns:
+			width = max((len(row[first:last]) for row in self.rows), default=0)
+			symbols = [""]
+			lut = {"": 0}
+			codes = array("H", bytes(2 * width * len(self.rows)))
+			for r, row in enumerate(self.rows):
+				for c, cell in enumerate(row[first:last]):
+					cell = cell.strip()
+					code = lut.get(cell)
+					if code is None:
+						code = lut[cell] = len(symbols)
+						symbols.append(cell)
+					codes[r * width + c] = code
+			self._columns[key] = (codes, symbols, width)
+		return self._columns[key]
+
+	def column(self, name):
+		i = self.layout.get(name)
+		if i is None: return None
+		if isinstance(i, tuple): return self.matrix(*i)
+		if name in ("names", "white", "black", "results"): return self.strings(i)
+		return self.numbers(i)
+
+	@property
+	def names(self): return self.column("names")
+
+	@property
+	def points(self): return self.column("points")
+
+	@property
+	def buchholz(self): return self.column("buchholz")
+
+	@property
+	def soberg(self): return self.column("soberg")
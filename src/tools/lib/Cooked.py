@@ -0,0 +1,63 @@
+import re
+from array import array
+
+RE_RESULT = re.compile(r"(0?\.5|0|1)(?::(0?\.5|0|1))?")
+
+def result(s):
+	"""White's points in a game of a game log: "1", "0.5", "0:1", ...
+
+	>>> result("1"), result(" .5 "), result("0:1")
+	(1.0, 0.5, 0.0)
+	>>> result("10")
+	Traceback (most recent call last):
+	ValueError: invalid result "10"
+	>>> result("1:1")
+	Traceback (most recent call last):
+	ValueError: invalid result "1:1"
+	"""
+	m = RE_RESULT.fullmatch(s.strip())
+	if not m or m.group(2) is not None and float(m.group(1)) + float(m.group(2)) != 1:
+		raise ValueError('invalid result "%s"' % s)
+	return float(m.group(1))
+
+class Cooked:
+	"""The standings of a game log (RWSE rows), as a #NP table would have them.
+
+	One entry per player, best first and ties by name (the order
+	tables.render uses). `colors` has one "w" or "b" per game, by round.
+	"""
+
+	def __init__(self, names, points, ranks, colors):
+		self.names = names
+		self.points = points
+		self.ranks = ranks
+		self.colors = colors
+
+	def __len__(self):
+		return len(self.names)
+
+	@classmethod
+	def fromGames(cls, rows):
+		"""
+		>>> c = Cooked.fromGames([["1", "A", "B", "1"], ["2", "C", "A", "0.5"], ["2", "B", "D", "0"]])
+		>>> c.names, list(c.points), c.ranks, c.colors
+		(['A', 'D', 'C', 'B'], [1.5, 1.0, 0.5, 0.0], [1, 2, 3, 4], ['wb', 'b', 'w', 'bw'])
+		"""
+		games = {}
+		for row in rows:
+			if not row: continue
+			r, w, b, s = row[:4]
+			s = result(s)
+			for name, score, color in ((w, s, "w"), (b, 1 - s, "b")):
+				p = games.setdefault(name, [0.0, []])
+				p[0] += score
+				p[1].append((int(r), color))
+
+		names = sorted(games)
+		names = sorted(names, key=lambda n: games[n][0], reverse=True)
+		points = array("d", (games[n][0] for n in names))
+		ranks = []
+		for i, p in enumerate(points):
+			ranks.append(ranks[-1] if i and points[i - 1] == p else i + 1)
+		colors = ["".join(c for r, c in sorted(games[n][1], key=lambda x: x[0])) for n in names]
+		return cls(names, points, ranks, colors)
@@ -1,5 +1,14 @@
 import csv, os, re
 
+try:
+	from . import header
+	from .Columns import Columns
+	from .Cooked import Cooked
+except ImportError:	# lib/CsvFile.py run on its own (python -m doctest)
+	import header
+	from Columns import Columns
+	from Cooked import Cooked
+
 class CsvFileError(Exception): pass
 class CsvFileTypeError(CsvFileError): pass
 class LineNormalizationError(CsvFileTypeError): pass
@@ -77,45 +86,16 @@ class CsvFileType:
 		't/#NGSRVPBS'
 		>>> CsvFileType.fromHeaderLine("xyz")
 		"""
-		text = text.strip()
-
-		if re.match("^#,\s*Name(,\s*\d+)+,\s*Punkte,\s*Platz$", text):
-			return "#NPP"
-		elif re.match("^#\t+Name(\t+\d+)+\t+Punkte\t+Platz$", text):
-			return "t/#NPP"
-		if re.match("^#,\s*Name(,\s*\d+)+,\s*Punkte$", text):
-			return "#NP"
-		elif re.match("^#\t+Name(\t+\d+)+\t+Punkte$", text):
-			return "t/#NP"
-		elif re.match("^#,\s*Name(,\s*\d+)+$", text):
-			return "#N"
-		elif re.match("^#\t+Name(\t+\d+)+$", text):
-			return "t/#N"
-		elif re.match("^#,\s*x\s*=\s*(,\s*\d+)+$", text):
-			return "#X"
-		elif re.match("^#\t+x\s*=\s*(\t+\d+)+$", text):
-			return "t/#X"
-		elif re.match("^Runde,\s*Weiss,\s*Schwarz,\s*Ergebnis$", text):
-			return "RWSE"
-		elif re.match("^Runde\t+Weiss\t+Schwarz\t+Ergebnis$", text):
-			return "t/RWSE"
-		elif re.match("^#,\s*Name,\s*G,\s*S,\s*R,\s*V,\s*Punkte,\s*Buchh,\s*Soberg$", text):
-			return "#NGSRVPBS"
-		elif re.match("^#\t+Name\t+G\t+S\t+R\t+V\t+Punkte\t+Buchh\t+Soberg$", text):
-			return "t/#NGSRVPBS"
-		elif re.match("^#,\s*Name,\s*Punkte(,\s*R\d+)+$", text):
-			return "#NPR"
-		elif re.match("^#\t+Name\t+Punkte(\t+R\d+)+$", text):
-			return "t/#NPR"
+		return header.htype(text)
 
 
 class CsvFile:
 
 	def __init__(self, path):
 		self.filepath = path
-		self.cookednames = []
-		self.cookedpoints = []
+		self.cooked = None
 		self.type, self.header, self.rows = self.load(path)
+		self.columns = Columns(self.type.format, self.rows)
 
 	@property
 	def filename(self): return os.path.basename(self.filepath)
@@ -130,13 +110,20 @@ class CsvFile:
 
 	def name(self, rid):
 		if self.type.needscooking:
-			if not self.cooked:
+			if self.cooked is None:
 				self.cook()
 			return self.cooked.names[rid]
 		return self.rows[rid][1]
 
-	def cooknames(self):
-		self.cookednames = range(100)
+	def pscore(self, rid):
+		if self.type.needscooking:
+			if self.cooked is None:
+				self.cook()
+			return self.cooked.points[rid]
+		return self.columns.points[rid]
+
+	def cook(self):
+		self.cooked = Cooked.fromGames(self.rows)
 
 	@classmethod
 	def load(cls, path):
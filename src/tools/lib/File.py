@@ -1,5 +1,10 @@
-import re, csv, os.path
-from . import abs
+import re, csv, collections, os.path
+from . import abs, fs, header, ranking, snapshot, store
+from .Columns import Columns
+from .Cooked import Cooked
+from .Tiebreaks import Tiebreaks
+
+Standings = collections.namedtuple("Standings", "points ranks rscores")
 
 class File:
 	class Error(Exception): pass
@@ -10,6 +15,10 @@ class File:
 		self.path = path
 		self._header = None
 		self._rows = None
+		self._columns = None
+		self._cooked = None
+		self._memo = {}
+		self._memorows = None
 
 	@classmethod
 	def check(cls, path):
@@ -29,25 +38,81 @@ class File:
 	def rows(self):
 		self.check(self.path)
 		if not self._rows:
-			with open(self.path, "r", encoding="utf8") as file:
-				self._header = file.readline().strip()
-				t = self.htype(self._header)
-				if not t:
-					raise Exception("unknown CSV type")
-				elif t.startswith("t/"):
-					reader = csv.reader(self.tabs2comma(line.strip()) for line in file)
-					self._rows = [line for line in reader if line]
-				else:
-					reader = csv.reader(line.strip() for line in file if line)
-					self._rows = [line for line in reader]
-			for i in range(len(self._rows)):
-				self._rows[i] = [cell.strip() for cell in self._rows[i]]
+			table = snapshot.lookup(self.path)
+			if table is not None:
+				header, t, rows = table
+				rows = self.clean(t, rows)
+			else:
+				header, rows = store.tables.load(self.path, self.parse, "File")
+			# The parsed table is shared; hand out a copy.
+			self._header = header
+			self._rows = [list(row) for row in rows]
+			self.invalidate()
 		return self._rows
 
+	@rows.setter
+	def rows(self, rows):
+		self._rows = rows
+		self.invalidate()
+
+	def invalidate(self):
+		"""Forgets columns, cooked standings and memoised ranks.
+
+		Replacing `rows` does this; call it after editing rows in place.
+		"""
+		self._columns = None
+		self._cooked = None
+		self._memo = {}
+		self._memorows = None
+
+	@property
+	def columns(self):
+		rows = self.rows
+		if self._columns is None or self._columns.rows is not rows:
+			self._columns = Columns(self.type.split("/")[-1], rows)
+		return self._columns
+
+	@classmethod
+	def parse(cls, path):
+		header, t, rows = cls.read(path)
+		return header, cls.clean(t, rows)
+
+	@classmethod
+	def read(cls, path):
+		"""The header line, its type and the rows as split by csv."""
+		with fs.probe(path) as probe:
+			lines = probe.lines()
+			header = next(lines, "")
+			t = probe.signature.type
+			if not t:
+				raise Exception("unknown CSV type")
+			elif t.startswith("t/"):
+				lines = (cls.tabs2comma(line) for line in lines)
+			rows = [line for line in csv.reader(lines)]
+		return header, t, rows
+
+	@classmethod
+	def clean(cls, t, rows):
+		if t.startswith("t/"):
+			rows = [row for row in rows if row]
+		return [[cell.strip() for cell in row] for row in rows]
+
 	@property
 	def type(self):
 		return self.htype(self.header)
 
+	@property
+	def needscooking(self):
+		return self.type.endswith("RWSE")
+
+	@property
+	def cooked(self):
+		"""The standings of a game log; see Cooked."""
+		rows = self.rows
+		if self._cooked is None:
+			self._cooked = Cooked.fromGames(rows)
+		return self._cooked
+
 	@classmethod
 	def tabs2comma(self, text):
 		return re.sub(r"\t+", ",", text)
@@ -71,35 +136,7 @@ class File:
 		't/#NGSRVPBS'
 		>>> File.htype("xyz")
 		"""
-		text = text.strip()
-		if re.match("^#,\s*Name(,\s*\d+)+,\s*Punkte,\s*Platz$", text):
-			return "#NPP"
-		elif re.match("^#\t+Name(\t+\d+)+\t+Punkte\t+Platz$", text):
-			return "t/#NPP"
-		if re.match("^#,\s*Name(,\s*\d+)+,\s*Punkte$", text):
-			return "#NP"
-		elif re.match("^#\t+Name(\t+\d+)+\t+Punkte$", text):
-			return "t/#NP"
-		elif re.match("^#,\s*Name(,\s*\d+)+$", text):
-			return "#N"
-		elif re.match("^#\t+Name(\t+\d+)+$", text):
-			return "t/#N"
-		elif re.match("^#,\s*x\s*=\s*(,\s*\d+)+$", text):
-			return "#X"
-		elif re.match("^#\t+x\s*=\s*(\t+\d+)+$", text):
-			return "t/#X"
-		elif re.match("^Runde,\s*Weiss,\s*Schwarz,\s*Ergebnis$", text):
-			return "RWSE"
-		elif re.match("^Runde\t+Weiss\t+Schwarz\t+Ergebnis$", text):
-			return "t/RWSE"
-		elif re.match("^#,\s*Name,\s*G,\s*S,\s*R,\s*V,\s*Punkte,\s*Buchh,\s*Soberg$", text):
-			return "#NGSRVPBS"
-		elif re.match("^#\t+Name\t+G\t+S\t+R\t+V\t+Punkte\t+Buchh\t+Soberg$", text):
-			return "t/#NGSRVPBS"
-		elif re.match("^#,\s*Name,\s*Punkte(,\s*R\d+)+$", text):
-			return "#NPR"
-		elif re.match("^#\t+Name\t+Punkte(\t+R\d+)+$", text):
-			return "t/#NPR"
+		return header.htype(text)
 
 	def points_column_index(self):
 		# TODO: Add more types!
@@ -111,77 +148,87 @@ class File:
 		if t.endswith("#NGSRVPBS"): return -3
 		raise Exception("score column not found: unknown table")
 
+	@property
+	def tiebreaks(self):
+		"""Buchholz, Sonneborn-Berger, ... of all rows, from the games in
+		the table (see Tiebreaks); None for tables without games."""
+		def compute():
+			t = self.type.split("/")[-1]
+			if t in ("#NP", "#NPP"): return Tiebreaks.fromCrosstable(self.columns)
+			if t == "#NPR": return Tiebreaks.fromRounds(self.columns)
+			if t == "RWSE": return Tiebreaks.fromGames(self.rows, self.cooked.names)
+			return None
+		return self.memo(("tiebreaks",), compute)
+
 	def tiebreaks_column_index(self):
 		if self.type.endswith("#NGSRVPBS"): return [-2, -1]
 		return []
 
-	def ranks(self, contiguous = False, roworder = False, tiebreaks = True):
-		#~ pscores = self.pscores()
-		#~ pscores = sorted(pscores, reverse = True)
-		#~ lut = range(len(pscores))
-		#~ lut = sorted(lut, reverse = True, key = lambda i: pscores[i])
-		#~ print(lut)
+	def memo(self, key, compute):
+		"""`compute()`, once per `key` until the rows are replaced (or invalidate())."""
+		rows = self.rows
+		if self._memorows is not rows:
+			self._memo = {}
+			self._memorows = rows
+		if key not in self._memo:
+			self._memo[key] = compute()
+		return self._memo[key]
 
-		ranks = ((i, s) for i, s in enumerate(self.pscores(tiebreaks = tiebreaks)))
-		ranks = sorted(ranks, reverse = True, key = lambda x: x[1])
-		# print('%30s' % self.path, " | ranks (sorted) ", ranks)
+	def ranks(self, contiguous = False, roworder = False, tiebreaks = True):
+		key = ("ranks", contiguous, roworder, tiebreaks)
+		return list(self.memo(key, lambda: self._ranks(contiguous, roworder, tiebreaks)))
 
+	def _ranks(self, contiguous, roworder, tiebreaks):
+		ranks = ranking.ranking(self.keys(tiebreaks), dense = contiguous)
 		assert len(ranks) >= 2
-
-		last = None
-		rank = 0
-		for index, rowindex_score in enumerate(ranks):
-			rowindex, score = rowindex_score
-			if score != last:
-				last = score
-				rank = rank + 1 if contiguous else index + 1
-			else:
-				if contiguous:
-					rank = index
-			ranks[index] = (rowindex, rank)
-
 		if roworder:
 			ranks = sorted(ranks, reverse = False, key = lambda x: x[0])
-			#~ print("ranks (de-sorted)", ranks)
-
-		#~ print(self.path, ranks)
 		return ranks
 
-	def pscores(self, tiebreaks = False, shift = 100):
-		i = self.points_column_index()
-		ss = [float(row[i]) for row in self.rows]
-		if tiebreaks:
-			ii = self.tiebreaks_column_index()
-			if ii:
-				ss = [[s] for s in ss]
-				for j, row in enumerate(self.rows):
-					for i in ii:
-						ss[j].append(float(row[i]))
-				if shift:
-					ss = [p * shift * shift + bu * shift + so * shift for p, bu, so in ss]
-		return ss
+	def keys(self, tiebreaks = False):
+		"""The score columns to rank by: points, then any tiebreaks."""
+		if self.needscooking: return [self.cooked.points]
+		columns = self.columns
+		ii = [self.points_column_index()]
+		if tiebreaks: ii += self.tiebreaks_column_index()
+		return [columns.numbers(i) for i in ii]
+
+	def pscores(self, tiebreaks = False):
+		"""Points, or (points, Buchholz, Sonneborn-Berger) with `tiebreaks`."""
+		def compute():
+			keys = self.keys(tiebreaks)
+			return list(keys[0]) if len(keys) == 1 else list(zip(*keys))
+		return list(self.memo(("pscores", tiebreaks), compute))
+
+	def standings(self, contiguous = False, tiebreaks = True):
+		"""Points, ranks and rank scores of all rows, in row order.
+
+		One pass per setting; pscore, rank and rscore just index into it.
+		"""
+		key = ("standings", contiguous, tiebreaks)
+		return self.memo(key, lambda: self._standings(contiguous, tiebreaks))
+
+	def _standings(self, contiguous, tiebreaks):
+		points = self.pscores()
+		ranks = [r for i, r in self.ranks(contiguous = contiguous, roworder = True, tiebreaks = tiebreaks)]
+		topscore = 9.0 if ranks.count(1) > 1 else 10.0
+		rscores = [topscore if r == 1 else max(0.0, 10.0 - r) for r in ranks]
+		return Standings(points, ranks, rscores)
 
 	def rscores(self, contiguous = False):
-		ranks = self.ranks(contiguous = contiguous, roworder = False)
-		if len(ranks) == 0: return None
-		if len(ranks) == 1: return 10.0
-		topscore = 9.0 if ranks[0][1] == ranks[1][1] else 10.0
-		ranks = sorted(ranks, reverse = False, key = lambda x: x[0])
-		ranks = [topscore if r[1] == 1 else max(0.0, 10.0 - r[1]) for r in ranks]
-		return ranks
+		return list(self.standings(contiguous).rscores)
 
 	def rank(self, rid, contiguous = False):
-		ranks = self.ranks(contiguous = contiguous)
-		for i, r in ranks:
-			if i == rid:
-				return r
+		ranks = self.standings(contiguous).ranks
+		return ranks[rid] if 0 <= rid < len(ranks) else None
 
 	def pscore(self, rid):
+		if self.needscooking: return self.cooked.points[rid]
 		i = self.points_column_index()
-		return float(self.rows[rid][i])
+		return self.columns.numbers(i)[rid]
 
 	def rscore(self, rid, contiguous = False):
-		return self.rscores(contiguous = contiguous)[rid]
+		return self.standings(contiguous).rscores[rid]
 
 	def players(self):
 		t = self.type
@@ -190,10 +237,6 @@ class File:
 		if t.startswith("#N"):
 			for row in self.rows:
 				yield int(row[0]), row[1]
-		#~ elif t.startswith("RWSE"):
-			#~ d = set()
-			#~ for row in self.rows:
-				#~ d.add(row[1])
-				#~ d.add(row[2])
-			#~ for i, n in enumerate(sorted(d), start=1):
-				#~ yield i, n
+		elif t.startswith("RWSE"):
+			for i, n in enumerate(self.cooked.names, start=1):
+				yield i, n
@@ -1,11 +1,20 @@
+import json, os
+
+from . import store
+from .File import File
+from .Names import FileId, HashedName, Name, Synonyms
+from .Tiebreaks import Tiebreak
+
 class History:
 
 	class Score:
-		def __init__(self, fid = None, pscore = 0, rscore = 0, rank = 0):
+		def __init__(self, fid = None, pscore = 0, rscore = 0, rank = 0, tiebreak = None, seq = None):
 			self.fid = fid
+			self.seq = seq		# (table, position in it): the order of a full load
 			self.pscore = pscore	# point scores
 			self.rscore = rscore	# ranking-based scores
 			self.rank = rank
+			self.tiebreak = tiebreak	# Buchholz, Sonneborn-Berger, ... (lib.Tiebreaks)
 
 	class Player:
 		def __init__(self):
@@ -13,6 +22,16 @@ class History:
 			self.name = None
 			self.names = []
 			self.scores = []
+			self.keys = {}	# sort keys (e.g. running totals) of the current scores
+
+		@property
+		def first(self):
+			return min(score.seq for score in self.scores)
+
+		def key(self, key, compute):
+			if key not in self.keys:
+				self.keys[key] = compute()
+			return self.keys[key]
 
 		def ptotals(self, min_length = 3):
 			for x in range(min_length, len(self.scores) + 1):
@@ -26,21 +45,39 @@ class History:
 			if reverse is None: reverse = True
 			self.scores = sorted(self.scores,
 				key=lambda score: score.pscore, reverse=reverse)
+			self.keys = {}
 
 		def sort_by_rscore(self, reverse = None):
 			if reverse is None: reverse = True
 			self.scores = sorted(self.scores,
 				key=lambda score: score.rscore, reverse=reverse)
+			self.keys = {}
 
 		def sort_by_rank(self, reverse = None):
 			if reverse is None: reverse = False
 			self.scores = sorted(self.scores,
 				key=lambda score: score.rank, reverse=not reverse)
+			self.keys = {}
 
 
+	# How players are ordered: the Player method that sorts their scores
+	#	and the key to sort the players by.
+	SORTS = {
+		"pscores": ("sort_by_pscore", lambda p, n: [s.pscore for s in p.scores]),
+		"ptotals": ("sort_by_pscore", lambda p, n: tuple(p.ptotals(n))),
+		"rscores": ("sort_by_rscore", lambda p, n: [s.rscore for s in p.scores]),
+		"rtotals": ("sort_by_rscore", lambda p, n: tuple(p.rtotals(n))),
+	}
+
+	VERSION = 2
+
 	def __init__(self, names, synonyms, contiguous = False):
 		self.players = []
 		self.contiguous = contiguous
+		self.synonyms = synonyms
+		self.files = {}		# path => store.stat() of the files in the history
+		self.sorting = None	# the last sort, redone after add_file/remove_file
+		self.order = {}		# path => index of the table, as in the paths given to update()
 		self.load(names, synonyms)
 
 	# def __iter__(self):
@@ -48,29 +85,131 @@ class History:
 
 	def load(self, names, synonyms):
 		self.players = []
-		groups = synonyms.groups(names)
-		for sid, names in groups.items():
-			player = self.Player()
-			player.sid = sid
-			player.name = synonyms.text(sid)
-			player.names = names
-			for name in names:
-				file = name.fid.file
-				rid = name.fid.id - 1
-
-				pscore = file.pscore(rid)
-				rscore = file.rscore(rid, contiguous = self.contiguous)
-				rank = file.rank(rid, contiguous = self.contiguous)
-
-				# There were issues with the ranking, particularly visible in how Messer's
-				#	performance was mis-calculated.
-				#~ if player.name == "Messer":
-					#~ print(player.name, file.path, "| RID", rid, "| PSCORE", pscore, "| RANK", rank, "| RSCORE", rscore)
-
-				score = self.Score(name.fid, pscore, rscore, rank)
-				player.scores.append(score)
+		self.synonyms = synonyms
+		self.files = {}
+		self.order = {}
+		self.add_names(names)
+
+	def score(self, name):
+		file = name.fid.file
+		rid = name.fid.id - 1
+
+		standings = file.standings(contiguous = self.contiguous)
+		pscore = standings.points[rid]
+		rscore = standings.rscores[rid]
+		rank = standings.ranks[rid]
+		tiebreaks = file.tiebreaks
+		tiebreak = tiebreaks[rid] if tiebreaks else None
+
+		# There were issues with the ranking, particularly visible in how Messer's
+		#	performance was mis-calculated.
+		#~ if player.name == "Messer":
+			#~ print(player.name, file.path, "| RID", rid, "| PSCORE", pscore, "| RANK", rank, "| RSCORE", rscore)
+
+		return self.Score(name.fid, pscore, rscore, rank, tiebreak)
+
+	def add_names(self, names):
+		"""Adds the scores of `names` (classified already); returns the
+		players that got new scores."""
+		players = {player.sid: player for player in self.players}
+		touched = {}
+		positions = {}
+		for name in names:
+			player = players.get(name.sid)
+			if player is None:
+				player = players[name.sid] = self.Player()
+				player.sid = name.sid
+				player.name = self.synonyms.text(name.sid)
+				self.players.append(player)
+			path = os.path.abspath(name.fid.file.path)
+			if path not in self.files: self.files[path] = store.stat(path)
+			if path not in self.order: self.order[path] = max(self.order.values(), default=-1) + 1
+			score = self.score(name)
+			score.seq = (self.order[path], positions.setdefault(path, 0))
+			positions[path] += 1
+			player.names.append(name)
+			player.scores.append(score)
+			touched[name.sid] = player
+		table = lambda fid: self.order[os.path.abspath(fid.file.path)]
+		for player in touched.values():
+			# As if all tables had been added at once, in order.
+			player.names.sort(key=lambda name: table(name.fid))
+			player.scores.sort(key=lambda score: score.seq)
 			player.sort_by_rscore()
-			self.players.append(player)
+		return list(touched.values())
+
+	def add_file(self, file):
+		"""Adds the results of one table (a File or a path).
+
+		Only the players in it are rescored; the last sort is redone.
+		"""
+		if not isinstance(file, File): file = File(file)
+		names = list(Name.load(file))
+		self.synonyms.classify_all(names)
+		touched = self.add_names(names)
+		self.resort(touched)
+		return touched
+
+	def remove_file(self, file):
+		"""Removes the results of one table (a File or a path)."""
+		path = os.path.abspath(file.path if isinstance(file, File) else file)
+		ours = lambda fid: os.path.abspath(fid.file.path) == path
+		touched = []
+		for player in self.players:
+			if any(ours(score.fid) for score in player.scores):
+				player.scores = [s for s in player.scores if not ours(s.fid)]
+				player.names = [n for n in player.names if not ours(n.fid)]
+				player.keys = {}
+				touched.append(player)
+		self.players = [player for player in self.players if player.scores]
+		self.files.pop(path, None)
+		self.order.pop(path, None)
+		self.resort([player for player in touched if player.scores])
+		return touched
+
+	def update(self, paths):
+		"""Makes the history hold exactly the tables `paths`: tables that
+		are gone or changed on disk are removed, new ones added (in order)."""
+		want = [os.path.abspath(path) for path in paths]
+		for path in want:
+			# Not read when up to date, but the results still depend on it.
+			for r in store.recorders: r.add(path)
+		# Scores are ordered by the position of their table in `paths`, as
+		#	in a history built from them; the tables kept may have moved.
+		order = {path: i for i, path in enumerate(want)}
+		moved = False
+		for player in self.players:
+			for score in player.scores:
+				i = order.get(os.path.abspath(score.fid.file.path))
+				if i is not None and i != score.seq[0]:
+					score.seq = (i, score.seq[1])
+					moved = True
+		self.order = dict(order)
+		for path in list(self.files):
+			if path not in want or self.files[path] != store.stat(path):
+				self.remove_file(path)
+		for path, given in zip(want, paths):
+			self.order[path] = order[path]	# remove_file forgets it
+			if path not in self.files:
+				self.add_file(given)
+		if moved: self.resort(self.players)
+
+	def resort(self, players):
+		# Only `players` changed: their scores are re-sorted, everyone else's
+		#	order and running totals are reused. Players that tie stay in
+		#	the order of their first table, as in a history built from scratch.
+		self.players.sort(key=lambda p: p.first)
+		if not self.sorting: return
+		kind, descending, min_length = self.sorting
+		self.sort(kind, descending, min_length, players)
+
+	def sort(self, kind, descending = True, min_length = 3, players = None):
+		psort, key = self.SORTS[kind]
+		for player in self.players if players is None else players:
+			getattr(player, psort)(reverse = descending)
+		self.sorting = (kind, descending, min_length)
+		self.players = sorted(self.players,
+			key=lambda p: p.key((kind, min_length), lambda: key(p, min_length)), reverse = descending)
 
 	@property
 	def max_scores_count(self):
@@ -80,25 +219,92 @@ class History:
 		return x
 
 	def sort_by_pscores(self, descending = True):
-		for player in self.players:
-			player.sort_by_pscore(reverse = descending)
-		self.players = sorted(self.players,
-			key=lambda p: [s.pscore for s in p.scores], reverse = descending)
+		self.sort("pscores", descending)
 
 	def sort_by_ptotals(self, min_length = 3, descending = True):
-		for player in self.players:
-			player.sort_by_pscore(reverse = descending)
-		self.players = sorted(self.players,
-			key=lambda p: tuple(p.ptotals(min_length)), reverse = descending)
+		self.sort("ptotals", descending, min_length)
 
 	def sort_by_rscores(self, descending = True):
-		for player in self.players:
-			player.sort_by_rscore(reverse = descending)
-		self.players = sorted(self.players,
-			key=lambda p: [s.rscore for s in p.scores], reverse = descending)
+		self.sort("rscores", descending)
 
 	def sort_by_rtotals(self, descending = True):
+		self.sort("rtotals", descending)
+
+	def dump(self):
+		files = {}
+		def path(file):
+			files.setdefault(file.path, self.files.get(os.path.abspath(file.path)))
+			return file.path
+		players = []
 		for player in self.players:
-			player.sort_by_rscore(reverse = descending)
-		self.players = sorted(self.players,
-			key=lambda p: tuple(p.rtotals()), reverse = descending)
+			players.append({
+				"sid": player.sid,
+				"name": player.name,
+				"names": [[n.text, path(n.fid.file), n.fid.id] for n in player.names],
+				"scores": [[path(s.fid.file), s.fid.id, s.pscore, s.rscore, s.rank,
+					list(s.tiebreak) if s.tiebreak else None, list(s.seq)] for s in player.scores],
+			})
+		return {
+			"version": self.VERSION,
+			"contiguous": self.contiguous,
+			"synonyms": [[n.text for n in nn] for nn in self.synonyms.synonyms],
+			"unresolved": [n.text for n in self.synonyms.unresolved],
+			"sorting": self.sorting,
+			"order": self.order,
+			"files": files,
+			"players": players,
+		}
+
+	@classmethod
+	def fromDump(cls, data, synonyms):
+		"""The history in `data` (see dump), or None if it was made with
+		other synonyms or by another version."""
+		if data.get("version") != cls.VERSION: return None
+		if data["synonyms"] != [[n.text for n in nn] for nn in synonyms.synonyms]: return None
+		synonyms.unresolved = [HashedName(text) for text in data["unresolved"]]
+		history = cls([], synonyms, data["contiguous"])
+		files = {path: File(path) for path in data["files"]}
+		history.files = {os.path.abspath(path): st for path, st in data["files"].items()}
+		for p in data["players"]:
+			player = cls.Player()
+			player.sid = p["sid"]
+			player.name = p["name"]
+			for text, path, id in p["names"]:
+				name = Name(text, FileId(files[path], id))
+				name.sid = player.sid
+				player.names.append(name)
+			for path, id, pscore, rscore, rank, tiebreak, seq in p["scores"]:
+				tiebreak = Tiebreak(*tiebreak) if tiebreak else None
+				player.scores.append(cls.Score(FileId(files[path], id), pscore, rscore, rank, tiebreak, tuple(seq)))
+			history.players.append(player)
+		history.sorting = tuple(data["sorting"]) if data["sorting"] else None
+		history.order = data["order"]
+		return history
+
+	def save(self, path):
+		with store.paused():
+			os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+			tmp = "%s.%d.tmp" % (path, os.getpid())
+			with open(tmp, "w", encoding="utf-8") as file:
+				json.dump(self.dump(), file)
+			os.replace(tmp, path)
+
+	@classmethod
+	def open(cls, path, paths, synonyms, contiguous = False):
+		"""The history of the tables `paths`, kept in the JSON file `path`.
+
+		Only tables added, removed or changed since the last run are read.
+		"""
+		history = None
+		with store.paused():
+			try:
+				with open(path, encoding="utf-8") as file:
+					history = cls.fromDump(json.load(file), synonyms)
+			except (OSError, ValueError, KeyError, TypeError):
+				history = None
+		if history is None or history.contiguous != contiguous:
+			synonyms.unresolved = []
+			history = cls([], synonyms, contiguous)
+		history.update(paths)
+		history.save(path)
+		return history
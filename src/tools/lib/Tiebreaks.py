@@ -0,0 +1,154 @@
+import re
+from array import array
+from collections import namedtuple
+
+from .Cooked import result
+
+RE_RESULT = re.compile(r"(0?\.5|0|1)[*wbsWBS]?(?:/(0?\.5|0|1)[*wbsWBS]?)?")
+RE_ROUND = re.compile(r"(\d+)[wsb](0?\.5|0|1)")
+
+# Cells that may mark the diagonal of a crosstable. Off it, "=" is a draw.
+EMPTY = frozenset(("=", "x", "X", "-"))
+
+Tiebreak = namedtuple("Tiebreak", "points buchholz median soberg wins direct")
+
+def lut(symbols):
+	"""Per symbol code: the number of games in the cell and their scores.
+
+	The count is 0 for an empty cell, -1 for a diagonal mark and -2 for
+	anything else that is no result. "=" counts as a draw; validate.check
+	lets it pass on the diagonal.
+
+	>>> games, first, second = lut(["", "1", "0.5/1*", "=", "x", "2"])
+	>>> list(games), list(first), list(second)
+	([0, 1, 2, 1, -1, -2], [0.0, 1.0, 0.5, 0.5, 0.0, 0.0], [0.0, 0.0, 1.0, 0.0, 0.0, 0.0])
+	"""
+	games, first, second = array("b"), array("d"), array("d")
+	for s in symbols:
+		m = RE_RESULT.fullmatch(s)
+		if s == "=":
+			games.append(1)
+			first.append(0.5)
+			second.append(0.0)
+		elif m:
+			games.append(1 if m.group(2) is None else 2)
+			first.append(float(m.group(1)))
+			second.append(float(m.group(2) or 0))
+		else:
+			games.append(0 if s == "" else -1 if s in EMPTY else -2)
+			first.append(0.0)
+			second.append(0.0)
+	return games, first, second
+
+def dot(matrix, vector):
+	return array("d", (sum(m * v for m, v in zip(row, vector)) for row in matrix))
+
+class Tiebreaks:
+	"""Tie-break scores of all players of a tournament, by player index.
+
+	Built from the result matrix S (S[i][j]: points of i against j) and
+	the game matrix G (G[i][j]: games of i against j):
+
+		points    = S . 1
+		buchholz  = G . points      (the opponents' points, once per game)
+		soberg    = S . points      (Sonneborn-Berger)
+		direct    = S . T           (T[i][j]: j has as many points as i)
+
+	`median` is the Buchholz without the best and the worst opponent (if
+	there were more than two games) and `wins` the number of games won.
+	"""
+
+	def __init__(self, points, buchholz, median, soberg, wins, direct):
+		self.points = points
+		self.buchholz = buchholz
+		self.median = median
+		self.soberg = soberg
+		self.wins = wins
+		self.direct = direct
+
+	def __len__(self):
+		return len(self.points)
+
+	def __getitem__(self, i):
+		return Tiebreak(self.points[i], self.buchholz[i], self.median[i],
+			self.soberg[i], self.wins[i], self.direct[i])
+
+	@classmethod
+	def fromResults(cls, n, results):
+		"""From (i, j, score) triples: what i scored in one game against j.
+
+		Every game is expected from both sides.
+
+		>>> t = Tiebreaks.fromResults(3, [(0, 1, 1), (1, 0, 0), (1, 2, 0.5), (2, 1, 0.5), (0, 2, 0.5), (2, 0, 0.5)])
+		>>> t[0]
+		Tiebreak(points=1.5, buchholz=1.5, median=1.5, soberg=1.0, wins=1, direct=0.0)
+		>>> t[1], t[2]
+		(Tiebreak(points=0.5, buchholz=2.5, median=2.5, soberg=0.5, wins=0, direct=0.0), Tiebreak(points=1.0, buchholz=2.0, median=2.0, soberg=1.0, wins=0, direct=0.0))
+		"""
+		S = [array("d", bytes(8 * n)) for i in range(n)]
+		G = [array("d", bytes(8 * n)) for i in range(n)]
+		wins = [0] * n
+		for i, j, s in results:
+			S[i][j] += s
+			G[i][j] += 1
+			if s == 1: wins[i] += 1
+
+		points = dot(S, [1.0] * n)
+		buchholz = dot(G, points)
+		soberg = dot(S, points)
+		T = [[1.0 if j != i and points[j] == points[i] else 0.0 for j in range(n)] for i in range(n)]
+		direct = array("d", (sum(s * t for s, t in zip(S[i], T[i])) for i in range(n)))
+
+		median = array("d")
+		for i in range(n):
+			opponents = sorted(points[j] for j in range(n) for k in range(int(G[i][j])))
+			if len(opponents) > 2: opponents = opponents[1:-1]
+			median.append(sum(opponents))
+		return cls(points, buchholz, median, soberg, wins, direct)
+
+	@classmethod
+	def fromCrosstable(cls, columns):
+		"""From the cells of a #NP or #NPP table (a Columns view)."""
+		first, last = columns.layout["cross"]
+		rows = columns.rows
+		n = len(rows)
+		codes, symbols, width = columns.matrix(first, len(rows[0]) + last if rows else 0)
+		games, a, b = lut(symbols)
+		results = []
+		for i in range(n):
+			for j in range(min(n, width)):
+				code = codes[i * width + j]
+				if i == j or games[code] <= 0: continue
+				results.append((i, j, a[code]))
+				if games[code] == 2: results.append((i, j, b[code]))
+		return cls.fromResults(n, results)
+
+	@classmethod
+	def fromRounds(cls, columns):
+		"""From the round cells of a #NPR table.
+
+		"6w1" is a win with white against the player in row 6 (the "#"
+		column is the place, which ties may share).
+		"""
+		first, last = columns.layout["rounds"]
+		n = len(columns.rows)
+		results = []
+		for i, row in enumerate(columns.rows):
+			for cell in row[first:last]:
+				m = RE_ROUND.fullmatch(cell)
+				if m and 0 < int(m.group(1)) <= n:
+					results.append((i, int(m.group(1)) - 1, float(m.group(2))))
+		return cls.fromResults(n, results)
+
+	@classmethod
+	def fromGames(cls, rows, names):
+		"""From a game log (RWSE rows); player i is names[i] (see Cooked)."""
+		index = {name: i for i, name in enumerate(names)}
+		results = []
+		for row in rows:
+			if not row: continue
+			r, w, b, s = row[:4]
+			s = result(s)
+			results.append((index[w], index[b], s))
+			results.append((index[b], index[w], 1 - s))
+		return cls.fromResults(len(names), results)
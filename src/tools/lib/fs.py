@@ -2,11 +2,14 @@ import collections, os, re, sys
 
 import __main__
 
+try: from . import header
+except ImportError: import header	# lib/fs.py run on its own (python -m doctest)
+
 Signature = collections.namedtuple("Signature", "type format istabbed istournament hasmatches hascolors hasrounds needscooking")
 
 builtin_type = type
 
-def root(top, __file=__main__.__file__):
+def root(top, __file=getattr(__main__, "__file__", "")):
 	"""
 	>>> root("user", __file="/home/user/folder/subfolder/script.py")
 	'/home/user/'
@@ -19,7 +22,7 @@ def root(top, __file=__main__.__file__):
 	tail = __file[i:]
 	return root
 
-def path(top, rel, __file=__main__.__file__):
+def path(top, rel, __file=getattr(__main__, "__file__", "")):
 	"""
 	>>> path("user", "run.py", __file="/home/user/folder1/subfolder/script.py")
 	'/home/user/run.py'
@@ -28,7 +31,7 @@ def path(top, rel, __file=__main__.__file__):
 	r = root(top, __file)
 	if r: return os.path.abspath(r + rel)
 
-def list(top, rel=None, __file=__main__.__file__):
+def list(top, rel=None, __file=getattr(__main__, "__file__", "")):
 	cwd = path(top, rel, __file)
 	for t,dd,nn in os.walk(cwd):
 		for n in nn:
@@ -73,55 +76,34 @@ def ftype(fp, encoding="utf8"):
 
 def type(text):
 	"""
-	>>> signature("Runde,Weiss,Schwarz,Ergebnis")
+	>>> type("Runde,Weiss,Schwarz,Ergebnis")
 	'RWSE'
-	>>> signature("Runde,\\tWeiss,	Schwarz,	Ergebnis")
+	>>> type("Runde,\\tWeiss,	Schwarz,	Ergebnis")
 	'RWSE'
-	>>> signature("Runde\\tWeiss\\t\\tSchwarz\\tErgebnis")
+	>>> type("Runde\\tWeiss\\t\\tSchwarz\\tErgebnis")
 	't/RWSE'
-	>>> signature("#,Name,1,2,3,4,5,Punkte")
+	>>> type("#,Name,1,2,3,4,5,Punkte")
 	'#NP'
-	>>> signature("#\\tName\\t1\\t2\\t3\\t4\\t5\\tPunkte")
+	>>> type("#\\tName\\t1\\t2\\t3\\t4\\t5\\tPunkte")
 	't/#NP'
-	>>> signature("#,Name,G,S,R,V,Punkte,Buchh,Soberg")
+	>>> type("#,Name,G,S,R,V,Punkte,Buchh,Soberg")
 	'#NGSRVPBS'
-	>>> signature("#\\tName\\tG\\tS\\tR\\tV\\tPunkte\\tBuchh\\tSoberg")
+	>>> type("#\\tName\\tG\\tS\\tR\\tV\\tPunkte\\tBuchh\\tSoberg")
 	't/#NGSRVPBS'
-	>>> signature("xyz")
+	>>> type("xyz")
+	''
 	"""
-	text = text.strip()
-
-	if re.match("^#,\s*Name(,\s*\d+)+,\s*Punkte,\s*Platz$", text):
-		return "#NPP"
-	elif re.match("^#\t+Name(\t+\d+)+\t+Punkte\t+Platz$", text):
-		return "t/#NPP"
-	if re.match("^#,\s*Name(,\s*\d+)+,\s*Punkte$", text):
-		return "#NP"
-	elif re.match("^#\t+Name(\t+\d+)+\t+Punkte$", text):
-		return "t/#NP"
-	elif re.match("^#,\s*Name(,\s*\d+)+$", text):
-		return "#N"
-	elif re.match("^#\t+Name(\t+\d+)+$", text):
-		return "t/#N"
-	elif re.match("^#,\s*x\s*=\s*(,\s*\d+)+$", text):
-		return "#X"
-	elif re.match("^#\t+x\s*=\s*(\t+\d+)+$", text):
-		return "t/#X"
-	elif re.match("^Runde,\s*Weiss,\s*Schwarz,\s*Ergebnis$", text):
-		return "RWSE"
-	elif re.match("^Runde\t+Weiss\t+Schwarz\t+Ergebnis$", text):
-		return "t/RWSE"
-	elif re.match("^#,\s*Name,\s*G,\s*S,\s*R,\s*V,\s*Punkte,\s*Buchh,\s*Soberg$", text):
-		return "#NGSRVPBS"
-	elif re.match("^#\t+Name\t+G\t+S\t+R\t+V\t+Punkte\t+Buchh\t+Soberg$", text):
-		return "t/#NGSRVPBS"
-	elif re.match("^#,\s*Name,\s*Punkte(,\s*R\d+)+$", text):
-		return "#NPR"
-	elif re.match("^#\t+Name\t+Punkte(\t+R\d+)+$", text):
-		return "t/#NPR"
-	return ""
+	return header.htype(text) or ""
 
 def signature(lines):
+	"""
+	>>> signature(["Runde,Weiss,Schwarz,Ergebnis"])
+	Signature(type='RWSE', format='RWSE', istabbed=False, istournament=True, hasmatches=True, hascolors=True, hasrounds=True, needscooking=True)
+	>>> signature(["#\\tName\\t1\\t2\\tPunkte", "1\\tA\\t=\\t1*\\t1"])
+	Signature(type='t/#NP', format='#NP', istabbed=True, istournament=True, hasmatches=True, hascolors=True, hasrounds=False, needscooking=False)
+	>>> signature(["xyz"])
+	Signature(type='', format='', istabbed=False, istournament=False, hasmatches=False, hascolors=False, hasrounds=False, needscooking=False)
+	"""
 	if not lines:
 		return Signature(None, "", False, False, False, False, False, False)
 
@@ -152,3 +134,49 @@ def signature(lines):
 	needscooking = format == "RWSE"
 
 	return Signature(t, format, tabbed, istournament, hasmatches, hascolors, hasrounds, needscooking)
+
+class Probe:
+	"""The signature of a table file from its first two lines.
+
+	Only those two lines are read; `lines()` then continues with the
+	same handle, so the file is opened once either way.
+
+	>>> import tempfile
+	>>> with tempfile.NamedTemporaryFile("w", suffix=".csv", delete=False) as f:
+	...	n = f.write("#,Name,1,2,Punkte\\n1,A,=,1*,1\\n2,B,0,=,0\\n")
+	>>> with probe(f.name) as p:
+	...	p.type, p.signature.hascolors, p.head, [line for line in p.lines()][2:]
+	('#NP', True, ['#,Name,1,2,Punkte', '1,A,=,1*,1'], ['2,B,0,=,0'])
+	>>> os.remove(f.name)
+	"""
+
+	def __init__(self, fp, encoding="utf8"):
+		self.path = fp
+		self.file = open(fp, "r", encoding=encoding)
+		self.head = []
+		for i in range(2):
+			line = self.file.readline()
+			if not line: break
+			self.head.append(line.strip())
+		self.signature = signature(self.head)
+
+	@property
+	def type(self):
+		return self.signature.type or ""
+
+	def lines(self):
+		yield from self.head
+		for line in self.file:
+			yield line.strip()
+
+	def close(self):
+		self.file.close()
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *aa):
+		self.close()
+
+def probe(fp, encoding="utf8"):
+	return Probe(fp, encoding)
@@ -0,0 +1,71 @@
+"""Table type of a CSV header line.
+
+The header is split into its cells once; every cell is reduced to a
+symbol (a known word, "1" for a number, "R1" for a round like R3, "x" for
+the "x =" corner) and runs of numbers and rounds are collapsed. The type
+is then a single dict lookup on that shape.
+
+Equivalent to the regex cascade this replaces, e.g. for #NP:
+	^#,\\s*Name(,\\s*\\d+)+,\\s*Punkte$
+	^#\\t+Name(\\t+\\d+)+\\t+Punkte$
+"""
+
+WORDS = frozenset("Name Punkte Platz G S R V Buchh Soberg Weiss Schwarz Ergebnis".split())
+
+TYPES = {
+	("#", "Name", "1", "Punkte", "Platz"): "#NPP",
+	("#", "Name", "1", "Punkte"): "#NP",
+	("#", "Name", "1"): "#N",
+	("#", "x", "1"): "#X",
+	("Runde", "Weiss", "Schwarz", "Ergebnis"): "RWSE",
+	("#", "Name", "G", "S", "R", "V", "Punkte", "Buchh", "Soberg"): "#NGSRVPBS",
+	("#", "Name", "Punkte", "R1"): "#NPR",
+}
+
+def symbol(cell):
+	if cell in WORDS: return cell
+	if cell.isdecimal(): return "1"
+	if cell[:1] == "R" and cell[1:].isdecimal(): return "R1"
+	if cell[:1] == "x" and cell[1:].strip() == "=": return "x"
+	return None
+
+def cells(text):
+	"""Splits `text` like the regexes would: ",\\s*" or "\\t+"."""
+	head, sep, tail = text.partition(",")
+	if sep and head in ("#", "Runde"):
+		return "", [head] + [c.lstrip() for c in tail.split(",")]
+	head, sep, tail = text.partition("\t")
+	if sep and head in ("#", "Runde"):
+		cc = [c for c in tail.split("\t") if c]
+		# "x\s*=\s*" may swallow tabs around the "=".
+		if cc and cc[0][:1] == "x":
+			i = next((i for i, c in enumerate(cc) if "=" in c), 0)
+			while i + 1 < len(cc) and cc[i + 1].isspace(): i += 1
+			cc[:i + 1] = ["\t".join(cc[:i + 1])]
+		return "t/", [head] + cc
+	return None, None
+
+def htype(text):
+	"""
+	>>> htype("Runde,\\tWeiss,	Schwarz,	Ergebnis")
+	'RWSE'
+	>>> htype("#\\tName\\t1\\t2\\t3\\tPunkte\\tPlatz")
+	't/#NPP'
+	>>> htype("#, x =, 1, 2")
+	'#X'
+	>>> htype("#,Name,Punkte,R1,R2")
+	'#NPR'
+	>>> htype("#,Name,Punkte,R")
+	>>> htype("#,Name ,1,Punkte")
+	>>> htype("xyz")
+	"""
+	prefix, cc = cells(text.strip())
+	if cc is None: return None
+	shape = []
+	for c in cc[1:]:
+		s = symbol(c)
+		if s is None: return None
+		if s in ("1", "R1") and shape and shape[-1] == s: continue
+		shape.append(s)
+	t = TYPES.get((cc[0], *shape))
+	return prefix + t if t else None
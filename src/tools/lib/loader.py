@@ -0,0 +1,34 @@
+"""Loads many tables at once, optionally in a pool of processes.
+
+The workers only parse; the parsed tables go into store.tables of this
+process, so the File objects returned read them from there. Everything
+comes back in the order of the paths given, whatever order the workers
+finish in, and is the same as loading the files one by one.
+"""
+
+import concurrent.futures, os
+
+from . import snapshot, store
+from .File import File
+from .Names import Name
+
+def parse(path):
+	return store.tables.load(path, File.parse, "File")
+
+def load(paths, jobs=1):
+	"""The Files for `paths`, with their rows parsed, and their Names."""
+	files = [File(path) for path in paths]
+	for file in files: File.check(file.path)
+	if jobs > 1 and len(files) > 1:
+		# Tables the snapshot has are not worth sending to a worker.
+		todo = [os.path.abspath(f.path) for f in files if snapshot.lookup(f.path) is None]
+		stats = [store.stat(path) for path in todo]
+		with concurrent.futures.ProcessPoolExecutor(min(jobs, len(todo) or 1)) as pool:
+			chunksize = max(1, len(todo) // (4 * jobs))
+			for path, st, data in zip(todo, stats, pool.map(parse, todo, chunksize=chunksize)):
+				store.tables.put(path, data, "File", st)
+	names = []
+	for file in files:
+		file.rows
+		names.extend(Name.load(file))
+	return files, names
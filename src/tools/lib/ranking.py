@@ -0,0 +1,44 @@
+"""Ranks from one or more score columns.
+
+The rows are put in order with a single sort on their key tuples: the
+first column decides and the others break ties, each compared exactly
+(nothing is packed into one float). Rows tie only if all keys are equal;
+tied rows keep their row order.
+"""
+
+def ranking(keys, dense=False, descending=True):
+	"""(row, rank) pairs, best first.
+
+	Ranks are competition ranks (1, 2, 2, 4) or, if `dense`, dense ranks
+	(1, 2, 2, 3).
+
+	>>> ranking([[3, 5, 3, 1]])
+	[(1, 1), (0, 2), (2, 2), (3, 4)]
+	>>> ranking([[3, 5, 3, 1]], dense=True)
+	[(1, 1), (0, 2), (2, 2), (3, 3)]
+	>>> ranking([[3, 5, 3, 1], [4, 0, 6, 9]])
+	[(1, 1), (2, 2), (0, 3), (3, 4)]
+	"""
+	# Tuples compare lexicographically; a single column sorts as it is.
+	key = keys[0] if len(keys) == 1 else list(zip(*keys))
+	order = sorted(range(len(key)), key=key.__getitem__, reverse=descending)
+	pairs = []
+	last = None
+	rank = 0
+	for index, i in enumerate(order):
+		if not index or key[i] != last:
+			last = key[i]
+			rank = rank + 1 if dense else index + 1
+		pairs.append((i, rank))
+	return pairs
+
+def ranks(keys, dense=False, descending=True):
+	"""The rank of every row, in row order.
+
+	>>> ranks([[3, 5, 3, 1]])
+	[2, 1, 2, 4]
+	"""
+	out = [0] * len(keys[0]) if keys else []
+	for i, rank in ranking(keys, dense, descending):
+		out[i] = rank
+	return out
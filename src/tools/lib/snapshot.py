@@ -0,0 +1,214 @@
+"""All tables of a directory in one binary file, read through mmap.
+
+Layout (native byte order, every block aligned to 8 bytes):
+
+	MAGIC, u32 index size, index (JSON)
+	string offsets (u32, one more than there are strings), string bytes
+	per table: row lengths (u16), cells (u32 string codes, rows x cols)
+	           and, if the points are numeric, points (i32, half points)
+
+The cells are the rows as csv splits them (File.read); File.clean still
+has to be applied for File's view of the table.
+
+The index lists every table with its size and mtime, so a table whose
+CSV changed is never served from the snapshot; `load` rebuilds the whole
+snapshot if any table was added, removed or changed.
+"""
+
+import json, mmap, os, struct, sys
+from array import array
+
+from . import store
+from .Catalog import Catalog
+from .Columns import Columns
+
+MAGIC = b"TABSNAP1"
+HEADER = struct.Struct("=8sI")
+
+active = None
+
+def align(n):
+	return (n + 7) & ~7
+
+class Writer:
+	def __init__(self):
+		self.chunks = []
+		self.size = 0
+
+	def add(self, data):
+		data = bytes(data)
+		offset = self.size
+		pad = align(len(data)) - len(data)
+		self.chunks.append(data + bytes(pad))
+		self.size += len(data) + pad
+		return offset
+
+def compile(tdir, opath):
+	"""Writes the snapshot of the tables in `tdir` to `opath`."""
+	from .File import File
+
+	strings = {}
+	def code(text):
+		if text not in strings: strings[text] = len(strings)
+		return strings[text]
+
+	w = Writer()
+	tables = {}
+	for entry in Catalog.open(tdir, refresh=True):
+		if not entry.type: continue
+		try: header, t, raw = File.read(entry.path)
+		except Exception: continue
+		rows = File.clean(t, raw)
+		cols = max([0] + [len(row) for row in raw])
+		cells = array("I", bytes(4 * cols * len(raw)))
+		for r, row in enumerate(raw):
+			for c, cell in enumerate(row):
+				cells[r * cols + c] = code(cell)
+		table = {
+			"size": entry.size, "mtime": entry.mtime, "type": entry.type,
+			"ptype": None, "header": code(header), "rows": len(raw), "cols": cols,
+			"lengths": w.add(array("H", [len(row) for row in raw])),
+			"cells": w.add(cells),
+			"points": None,
+		}
+		p = entry.ptype
+		if p: table["ptype"] = [p.type, p.year, p.month, p.extra]
+		try:
+			points = Columns(entry.type.split("/")[-1], rows).points
+			if points is not None:
+				table["points"] = [w.add(array("i", (round(x * 2) for x in points))), len(points)]
+		except (ValueError, IndexError):
+			pass
+		tables[os.path.relpath(entry.path, tdir)] = table
+
+	blob = b"".join(s.encode("utf-8") for s in strings)
+	offsets = array("I", [0])
+	for s in strings:
+		offsets.append(offsets[-1] + len(s.encode("utf-8")))
+	index = {
+		"byteorder": sys.byteorder,
+		"strings": [w.add(offsets), w.add(blob), len(strings)],
+		"tables": tables,
+		"size": w.size,
+	}
+	data = json.dumps(index).encode("utf-8")
+	start = align(HEADER.size + len(data))
+
+	os.makedirs(os.path.dirname(opath) or ".", exist_ok=True)
+	tmp = "%s.%d.tmp" % (opath, os.getpid())
+	with store.paused():
+		with open(tmp, "wb") as file:
+			file.write(HEADER.pack(MAGIC, len(data)))
+			file.write(data)
+			file.write(bytes(start - HEADER.size - len(data)))
+			for chunk in w.chunks:
+				file.write(chunk)
+		os.replace(tmp, opath)
+
+class Snapshot:
+	class Error(Exception): pass
+
+	def __init__(self, path, tdir):
+		self.path = path
+		self.tdir = tdir
+		with open(path, "rb") as file:
+			self.mm = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+		self.view = memoryview(self.mm)
+		magic, size = HEADER.unpack_from(self.mm)
+		if magic != MAGIC: raise self.Error("not a snapshot: %s" % path)
+		self.index = json.loads(self.view[HEADER.size:HEADER.size + size].tobytes())
+		if self.index["byteorder"] != sys.byteorder: raise self.Error("wrong byte order")
+		self.start = align(HEADER.size + size)
+		if len(self.mm) < self.start + self.index["size"]: raise self.Error("truncated: %s" % path)
+		offsets, blob, count = self.index["strings"]
+		self.offsets = self.slice(offsets, "I", count + 1)
+		self.blob = self.start + blob
+		self.strings = [None] * count
+		self.tables = {os.path.join(os.path.abspath(tdir), p): t
+			for p, t in self.index["tables"].items()}
+
+	def slice(self, offset, format, count):
+		"""A zero-copy view of `count` items at `offset` of the data."""
+		offset += self.start
+		n = count * array(format).itemsize
+		return self.view[offset:offset + n].cast(format)
+
+	def string(self, code):
+		s = self.strings[code]
+		if s is None:
+			a, b = self.offsets[code], self.offsets[code + 1]
+			s = self.strings[code] = str(self.view[self.blob + a:self.blob + b], "utf-8")
+		return s
+
+	def stale(self):
+		catalog = Catalog.open(self.tdir, refresh=True)
+		tables = self.index["tables"]
+		seen = 0
+		for entry in catalog:
+			if not entry.type: continue
+			t = tables.get(os.path.relpath(entry.path, self.tdir))
+			if t is None or t["size"] != entry.size or t["mtime"] != entry.mtime:
+				return True
+			seen += 1
+		return seen != len(tables)
+
+	def get(self, path):
+		"""The table's index entry, if the snapshot has it and it is current."""
+		t = self.tables.get(os.path.abspath(path))
+		if t is None: return None
+		st = store.stat(path)
+		if st != [t["size"], t["mtime"]]: return None
+		# As if the CSV had been read.
+		for r in store.recorders: r.add(path)
+		return t
+
+	def table(self, path):
+		"""(header line, type, rows) like File.read: the rows as split by
+		csv, before File.clean drops empty ones and strips the cells."""
+		t = self.get(path)
+		if t is None: return None
+		cols = t["cols"]
+		lengths = self.slice(t["lengths"], "H", t["rows"])
+		cells = self.slice(t["cells"], "I", cols * t["rows"])
+		rows = [[self.string(c) for c in cells[r * cols:r * cols + lengths[r]]]
+			for r in range(t["rows"])]
+		return self.string(t["header"]), t["type"], rows
+
+	def type(self, path):
+		t = self.get(path)
+		return t["type"] if t else None
+
+	def points(self, path):
+		"""The points column in half points, as a view into the snapshot."""
+		t = self.get(path)
+		if t is None or t["points"] is None: return None
+		offset, count = t["points"]
+		return self.slice(offset, "i", count)
+
+	def find(self, year=None, month=None, type=None):
+		for path, t in self.tables.items():
+			p = t["ptype"]
+			if not p: continue
+			if year is not None and p[1] != year: continue
+			if month is not None and p[2] != month: continue
+			if type is not None and p[0] != type: continue
+			yield path
+
+def load(path, tdir="tables"):
+	"""Loads the snapshot at `path`, (re)building it if it is missing or
+	stale, and makes it the one `lookup` answers from."""
+	global active
+	try:
+		snapshot = Snapshot(path, tdir)
+		if snapshot.stale(): snapshot = None
+	except (OSError, ValueError, KeyError, struct.error, Snapshot.Error):
+		snapshot = None
+	if snapshot is None:
+		compile(tdir, path)
+		snapshot = Snapshot(path, tdir)
+	active = snapshot
+	return snapshot
+
+def lookup(path):
+	if active is None: return None
+	return active.table(path)
@@ -0,0 +1,36 @@
+"""Where lib reads parsed tables from and records what it read.
+
+These are the stores of cache (tools/cache.py) if it can be imported. lib
+on its own, without tools/ on sys.path, keeps parsed tables in memory
+and records nothing.
+"""
+
+import contextlib, os
+
+try:
+	from cache import paused, recorders, stat, tables
+except ImportError:
+	recorders = []
+	paused = contextlib.nullcontext
+
+	def stat(path):
+		try: st = os.stat(path)
+		except OSError: return None
+		return [st.st_size, st.st_mtime_ns]
+
+	class Tables:
+		def __init__(self):
+			self.memo = {}
+
+		def load(self, path, parse, kind=""):
+			path = os.path.abspath(path)
+			st = stat(path)
+			key = (kind, path)
+			if key not in self.memo or self.memo[key][0] != st:
+				self.memo[key] = (st, parse(path))
+			return self.memo[key][1]
+
+		def put(self, path, data, kind="", st=None):
+			self.memo[(kind, os.path.abspath(path))] = (st, data)
+
+	tables = Tables()
@@ -1,9 +1,11 @@
 #~ import init
 
 from lib.File import File
+from lib.Catalog import Catalog
+from lib import loader, snapshot
 from lib.Names import Name, Synonyms, DEFAULT_SYNONYMS
 
-import copy, csv, glob, math, os, sys
+import argparse, copy, csv, fnmatch, glob, math, os, sys
 
 EST_PERF_FACTOR = 10
 EST_MIN_RATING = 1550
@@ -124,18 +126,15 @@ def split_into_groups(players, groups = 0):
 	return out
 
 
-def load_tournament_files():
+def load_tournament_files(jobs = 1):
 	#~ root = init.root(__file__, "src")
 	root = ""
-	nn = glob.glob(root + "tables/[sb]*[e0-9].csv")
-	#~ print(len(nn), nn)
+	catalog = Catalog.open(root + "tables", refresh=True)
+	ee = catalog.find(match=lambda n: fnmatch.fnmatch(n, "[sb]*[e0-9].csv"))
+	ee = [e for e in ee if e.type]
+	#~ print(len(ee), ee)
 
-	ff = (File(n) for n in nn)
-	ff = [f for f in ff if f.type]
-
-	names = []
-	for f in ff:
-		names.extend(Name.load(f))
+	ff, names = loader.load([e.path for e in ee], jobs)
 	synonyms = Synonyms(DEFAULT_SYNONYMS)
 	synonyms.classify_all(names)
 
@@ -185,8 +184,8 @@ def print_totals():
 		print(t)
 
 
-def extend_players_with_totals(players):
-	ff, synonyms = load_tournament_files()
+def extend_players_with_totals(players, jobs = 1):
+	ff, synonyms = load_tournament_files(jobs)
 	pp = load_players(ff, synonyms)
 	totals = load_totals(pp)
 	for player in players:
@@ -406,17 +405,17 @@ def main2():
 	plot2(players, tournament_count)
 
 
-def main3():
+def main3(ipath = "tables/meister-23-players.csv", jobs = 1):
 	mode = 1
 
-	players = load_csv("tables/meister-23-players.csv")
+	players = load_csv(ipath)
 
 	#~ asked = len(players)
 	#~ confirmed = sum(it[1] for it in players)
 	#~ print("  (", confirmed, "of", asked, "are confirmed )\n")
 
 	#~ print_totals()
-	extend_players_with_totals(players)
+	extend_players_with_totals(players, jobs)
 	estimate_ratings(players)
 
 	#~ players = sorted(players, key = byRest, reverse = True)
@@ -441,6 +440,15 @@ def main3():
 	#~ plot2(players)
 
 
+def main(argv=sys.argv):
+	p = argparse.ArgumentParser()
+	p.add_argument("players", nargs="?", default="tables/meister-23-players.csv")
+	p.add_argument("--snapshot", metavar="PATH", help="read the tables from (and refresh) this snapshot")
+	p.add_argument("-j", "--jobs", metavar="N", type=int, default=1, help="parse the tables in N processes")
+	aa = p.parse_args(argv[1:])
+	if aa.snapshot: snapshot.load(aa.snapshot)
+	return main3(aa.players, aa.jobs)
+
+
 if __name__ == "__main__":
-	main = main3
 	sys.exit(main())
@@ -93,12 +93,12 @@ def printhtml(ipath, ofile=sys.stdout, prefix=""):
 			))
 		ofile.write(prefix + '</article>\n')
 
-if __name__ == "__main__":
+def main(argv=sys.argv):
 	p = tools.argParser()
 	tools.argParserIOF(p, idef=tools.root("content", "news.txt"))
 	p.add("--mode", choices=["list","html"], default="list")
 	p.add("--prefix", default="")
-	p, aa = p.parse()
+	p, aa = p.parse(argv)
 	#~ print(aa); exit()
 
 	if aa.mode == "list":
@@ -106,3 +106,6 @@ if __name__ == "__main__":
 	elif aa.mode == "html":
 		with tools.oopen(aa.opath, aa.force) as ofile:
 			printhtml(aa.ipath, ofile, aa.prefix)
+
+if __name__ == "__main__":
+	main()
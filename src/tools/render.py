@@ -1,21 +1,57 @@
-import sys, re, io, os
-import tools
+import sys, re, io, os, copy, hashlib, json, time
+import concurrent.futures
+import tools, cache, deps
 import traceback, pprint
 
 class Error(Exception): pass
 class ProcessError(Exception): pass
 
+#~ RE_BLOCK = re.compile(r'\{\{\s*(.+?)\s*\}\}')
+#~ RE_BLOCK = re.compile(r'(?P<pre>[ \t]*)(?:\{\{\s*(?P<cmd>.+?)\s*\}\})(?P<post>\r\n|\r|\n)')
+RE_BLOCK = re.compile(r'((?:^[ \t]+)?)((?:[#][ \t]*)?)\{\{\s*(.+?)\s*\}\}', re.MULTILINE)
+
 def main(argv=sys.argv):
 	p = tools.ArgParser()
-	p.add("ipath", "PATH")
+	p.add("ipath", "PATH", nargs="?")
 	p.add("args", "KEY=VAL", nargs="*")
 	p.add("-o", "--opath", "PATH", default=None)
 	p.add("-e", "--epath", "PATH", default=tools.root("dist", "render.log"))
 	p.add("-d", action="store_true")
+	p.add("-s", "--shell", action="store_true", help="run every block through the shell")
+	p.add("-b", "--batch", "PATH", default=None,
+		help="render each 'IPATH OPATH [KEY=VAL ...]' line of PATH ('-' for stdin)")
+	p.add("--cache-dir", "PATH", default=tools.root("build", "cache"))
+	p.add("--cache-size", "MB", type=float, default=64)
+	p.add("--template-dir", "PATH", default=tools.root("build", "templates"))
+	p.add("--table-dir", "PATH", default=tools.root("build", "tables"))
+	p.add("--no-cache", action="store_true")
+	p.add("-j", "--jobs", "N", type=int, default=1, help="run up to N blocks of a page at once")
+	p.add("--profile", "PATH", default=None, help="write block and page timings to PATH (JSON)")
 	aa = p.parse(argv)
 	#~ if aa.epath is None: aa.epath = aa.ipath + ".log" # tools.noext(aa.ipath) + ".log"
-	aa.args = {k : v for k, v in (s.split("=") for s in aa.args if "=" in s)}
-	generate(p, aa)
+	aa.cache = open_cache(aa)
+	if not tools.dispatch.depth:
+		cache.templates.root = None if aa.no_cache else aa.template_dir
+		cache.tables.root = None if aa.no_cache else aa.table_dir
+	if aa.profile and not tools.dispatch.depth:
+		global profile
+		profile = Profile()
+	try:
+		if aa.batch: return batch(p, aa)
+		if not aa.ipath: p.error("need an input PATH (or --batch)")
+		aa.args = parse_args(aa.args)
+		generate(p, aa)
+	finally:
+		if profile: profile.write(aa.profile)
+
+def parse_args(args):
+	return {k : v for k, v in (s.split("=", 1) for s in args if "=" in s)}
+
+def open_cache(aa):
+	# A nested render (navbar, header, ...) is already covered by the
+	#	cache entry of the block that includes it.
+	if aa.no_cache or aa.shell or tools.dispatch.depth: return None
+	return cache.Cache(aa.cache_dir, int(aa.cache_size * 1024 * 1024))
 
 def log(p, aa, e):
 	if aa.epath:
@@ -25,26 +61,196 @@ def log(p, aa, e):
 		ferr.write("\n")
 		traceback.print_exception(e, file=ferr)
 
+def manifest(path):
+	file = sys.stdin if path == "-" else open(path, encoding="utf-8")
+	with file:
+		for line in file:
+			line = line.strip()
+			if not line or line.startswith("#"): continue
+			ipath, opath, *args = line.split()
+			yield ipath, opath, parse_args(args)
+
+def batch(p, aa):
+	# All pages share this process, so the tool modules imported by
+	#	tools.dispatch (and whatever they cache) are reused between them.
+	failed = 0
+	for ipath, opath, args in manifest(aa.batch):
+		a = copy.copy(aa)
+		a.ipath, a.opath, a.args, a.batch = ipath, opath, args, None
+		odir = os.path.dirname(opath)
+		if odir: os.makedirs(odir, exist_ok=True)
+		try: generate(p, a)
+		except Exception as e:
+			log(p, a, e)
+			print('render: %s: %s' % (ipath, e), file=sys.stderr)
+			failed += 1
+	return 1 if failed else 0
+
+def compile_template(text):
+	return tools.rsplit(text, RE_BLOCK)
+
 def generate(p, aa):
-	#~ splitter = re.compile(r'\{\{\s*(.+?)\s*\}\}')
-	#~ splitter = re.compile(r'(?P<pre>[ \t]*)(?:\{\{\s*(?P<cmd>.+?)\s*\}\})(?P<post>\r\n|\r|\n)')
-	splitter = re.compile(r'((?:^[ \t]+)?)((?:[#][ \t]*)?)\{\{\s*(.+?)\s*\}\}', re.MULTILINE)
-	text = open(aa.ipath, encoding="utf-8").read()
+	page = profile.page(aa) if profile and not tools.dispatch.depth else None
+	chunks = cache.templates.load(aa.ipath, compile_template, RE_BLOCK.pattern)
+	if aa.jobs > 1 and not tools.dispatch.depth:
+		chunks = parallel(p, aa, chunks, page)
+	else:
+		chunks = ((key, process(p, aa, chunk, page) if key else chunk) for key, chunk in chunks)
 	with tools.oopen(aa.opath, force=True) as ofile:
-		for key, chunk in tools.rsplit(text, splitter):
-			ofile.write(process(p, aa, chunk) if key else chunk)
+		for key, chunk in chunks:
+			ofile.write(chunk)
+			if page: page["size"] += len(chunk.encode("utf-8"))
+	if page: profile.done(page)
 
-def process(p, aa, groups):
+def prepare(p, aa, groups):
 	prefix, cmt, cmd = groups
-	if cmt: return ""
+	if cmt: return None
 	#~ print("|%s| |%s| (%d)" % (cmd, prefix, len(prefix)))
-	try: cmd = cmd.format(p=p, aa=aa, prefix=prefix, **aa.args)
+	try: return cmd.format(p=p, aa=aa, prefix=prefix, **aa.args)
 	except KeyError as e:
 		log(p, aa, e)
-		return ""
-	out, err = tools.shell(cmd, "utf-8")
+		return None
+
+def process(p, aa, groups, page=None):
+	cmd = prepare(p, aa, groups)
+	if cmd is None: return ""
+	if page is None: return check(execute(aa, cmd))
+	result = measure(aa, cmd)
+	page["blocks"].append(result[2])
+	return check(result)
+
+def check(result):
+	out, err = result[:2]
 	if err: raise ProcessError(err)
 	return out
 
+pool = None
+
+def parallel(p, aa, chunks, page=None):
+	# Blocks never depend on each other, so they can all be started up
+	#	front. Results are still written back in document order.
+	global pool
+	if pool is None:
+		pool = concurrent.futures.ProcessPoolExecutor(aa.jobs)
+	futures = []
+	for key, chunk in chunks:
+		if key:
+			cmd = prepare(p, aa, chunk)
+			if cmd is not None:
+				chunk = pool.submit(execute if page is None else measure, aa, cmd)
+			else: chunk = ""
+		futures.append((key, chunk))
+	for key, chunk in futures:
+		if isinstance(chunk, concurrent.futures.Future):
+			result = chunk.result()
+			if page is not None: page["blocks"].append(result[2])
+			chunk = check(result)
+		yield key, chunk
+
+def execute(aa, cmd):
+	kind, argv = (None, None) if aa.shell else tools.dispatch.resolve(cmd)
+	if not kind:
+		cache.taint()
+		return tools.shell(cmd, "utf-8") + ("shell",)
+	if kind == "python" and isinclude(argv):
+		return include(aa, cmd, argv)
+	return run(aa, cmd, kind)
+
+def isinclude(argv):
+	name = os.path.splitext(os.path.basename(argv[1]))[0]
+	return name == "render" and not any(a.startswith(("-o", "--opath")) for a in argv[2:])
+
+def include(aa, cmd, argv):
+	# The same fragment with the same arguments renders the same way for
+	#	the lifetime of a build, so each variant is rendered only once.
+	key = [os.getcwd()]
+	for a in argv[1:]:
+		if os.path.isfile(a):
+			with open(a, "rb") as file:
+				a = (a, hashlib.sha256(file.read()).hexdigest())
+		key.append(a)
+	key = tuple(key)
+	status = "memo"
+	if key not in cache.partials:
+		with cache.Recorder() as r:
+			out, err, status = run(aa, cmd, "python")
+		if err: return out, err, status
+		cache.partials[key] = (out, r.tainted, r.deps)
+	out, tainted, deps = cache.partials[key]
+	cache.replay(tainted, deps)
+	return out, "", status
+
+def run(aa, cmd, kind):
+	if kind != "python" or not aa.cache:
+		return tools.dispatch(cmd, "utf-8") + ("none",)
+	key = aa.cache.key(cmd, deps.RE_DEPS1)
+	out = aa.cache.get(key)
+	if out is not None: return out, "", "hit"
+	with cache.Recorder() as r:
+		out, err = tools.dispatch(cmd, "utf-8")
+	if err or r.tainted:
+		return out, err, "skip"
+	aa.cache.put(key, out, r.deps)
+	return out, err, "miss"
+
+def clock():
+	# process_time() is exact for the tools run in-process; os.times() only
+	#	counts in clock ticks (10 ms), so it is used just for the CPU time of
+	#	child processes (shell commands, non-Python tools), which it alone has.
+	t = os.times()
+	return time.perf_counter(), time.process_time(), t.children_user + t.children_system
+
+def elapsed(start):
+	wall, cpu, children = clock()
+	return wall - start[0], (cpu - start[1]) + (children - start[2])
+
+def measure(aa, cmd):
+	start = clock()
+	out, err, status = execute(aa, cmd)
+	wall, cpu = elapsed(start)
+	return out, err, {"cmd": cmd, "wall": wall, "cpu": cpu,
+		"size": len(out.encode("utf-8")), "cache": status}
+
+class Profile:
+	"""Wall time, CPU time (including child processes), output size and
+	cache status of every page and every top-level block."""
+
+	def __init__(self):
+		self.pages = []
+
+	def page(self, aa):
+		page = {"ipath": aa.ipath, "opath": aa.opath, "wall": 0.0, "cpu": 0.0,
+			"size": 0, "blocks": [], "start": clock()}
+		self.pages.append(page)
+		return page
+
+	def done(self, page):
+		page["wall"], page["cpu"] = elapsed(page.pop("start"))
+
+	def slowest(self, count=10):
+		cmds = {}
+		for page in self.pages:
+			for block in page["blocks"]:
+				c = cmds.setdefault(block["cmd"], {"cmd": block["cmd"], "count": 0,
+					"wall": 0.0, "cpu": 0.0, "size": block["size"], "cache": {}})
+				c["count"] += 1
+				c["wall"] += block["wall"]
+				c["cpu"] += block["cpu"]
+				c["cache"][block["cache"]] = c["cache"].get(block["cache"], 0) + 1
+		return sorted(cmds.values(), key=lambda c: c["wall"], reverse=True)[:count]
+
+	def write(self, path, file=None):
+		slowest = self.slowest()
+		with open(path, "w", encoding="utf-8") as ofile:
+			json.dump({"pages": self.pages, "slowest": slowest}, ofile, indent="\t")
+		file = file or sys.stderr
+		file.write("%10s %10s %8s %4s  %-12s %s\n" % ("wall ms", "cpu ms", "bytes", "n", "cache", "command"))
+		for c in slowest:
+			cc = ",".join("%s:%d" % x for x in sorted(c["cache"].items()))
+			file.write("%10.3f %10.3f %8d %4d  %-12s %s\n" % (c["wall"] * 1000, c["cpu"] * 1000,
+				c["size"], c["count"], cc, c["cmd"]))
+
+profile = None
+
 if __name__ == "__main__":
-	main()
+	sys.exit(main())
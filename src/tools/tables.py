@@ -5,12 +5,18 @@ import re
 import sys
 import collections
 
+import lib.header
+import lib.ranking
+import lib.snapshot
+from lib.Columns import Columns
+from lib.Tiebreaks import Tiebreaks
+
 # TODO: Use the new lib; in particular lib.File .
 
 def parse_args(args=sys.argv[1:]):
 	p = argparse.ArgumentParser()
 	p.add_argument("-t", "--type", action="store_true", help="determine file type")
-	p.add_argument("file")
+	p.add_argument("file", nargs="+", help="a table, or several game logs to merge")
 	aa = p.parse_args(args)
 	return p, aa
 
@@ -41,34 +47,7 @@ def determine_csv_type(file_or_line):
 	else:
 		header = file_or_line.readline().strip()
 
-	if re.match("^#,\s*Name(,\s*\d+)+,\s*Punkte$", header):
-		return "#NP"
-	elif re.match("^#\t+Name(\t+\d+)+\t+Punkte$", header):
-		return "t/#NP"
-	elif re.match("^#,\s*Name(,\s*\d+)+,\s*Punkte,\s*Platz$", header):
-		return "#NPP"
-	elif re.match("^#\t+Name(\t+\d+)+\t+Punkte\t+Platz$", header):
-		return "t/#NPP"
-	elif re.match("^#,\s*Name(,\s*\d+)+$", header):
-		return "#N"
-	elif re.match("^#\t+Name(\t+\d+)+$", header):
-		return "t/#N"
-	elif re.match("^#,\s*x\s*=\s*(,\s*\d+)+$", header):
-		return "#X"
-	elif re.match("^#\t+x\s*=\s*(\t+\d+)+$", header):
-		return "t/#X"
-	elif re.match("^Runde,\s*Weiss,\s*Schwarz,\s*Ergebnis$", header):
-		return "RWSE"
-	elif re.match("^Runde\t+Weiss\t+Schwarz\t+Ergebnis$", header):
-		return "t/RWSE"
-	elif re.match("^#,\s*Name,\s*G,\s*S,\s*R,\s*V,\s*Punkte,\s*Buchh,\s*Soberg$", header):
-		return "#NGSRVPBS"
-	elif re.match("#\t+Name\t+G\t+S\t+R\t+V\t+Punkte\t+Buchh\t+Soberg", header):
-		return "t/#NGSRVPBS"
-	elif re.match("^#,\s*Name,\s*Punkte(,\s*R\d+)+$", header):
-		return "#NPR"
-	elif re.match("^#\t+Name\t+Punkte(\t+R\d+)+$", header):
-		return "t/#NPR"
+	return lib.header.htype(header)
 
 def collapse_tabs(text):
 	"""
@@ -329,12 +308,8 @@ class Players:
 			reverse=reverse)
 
 	def placing(self):
-		totals = [p.total for p in self]
-		ranking = list(range(1, len(self) + 1))
-		for i in range(1, len(ranking)):
-			if totals[i - 1] == totals[i]:
-				ranking[i] = ranking[i - 1]
-		return ranking
+		# Competition ranks in the current order of the players.
+		return lib.ranking.ranks([[p.total for p in self]])
 
 	def update_placing(self):
 		# (Usually) Assumes self.sort_by_score() was called.
@@ -374,39 +349,67 @@ def iter_table_indices(rowcount, colcount, rowoffset=0, coloffset=0):
 			if col <= row: continue
 			yield row + 1, col + 1, row + rowoffset, col + coloffset
 
-def parse(path):
-	with open(path, "r", encoding="utf-8") as file:
-		t = determine_csv_type(file)
-		if not t:
-			raise Exception("unknown CSV type")
-		elif t.startswith("t/"):
-			reader = csv.reader(collapse_tabs(line.strip()) for line in file)
-			rows = [line for line in reader]
-		else:
-			reader = csv.reader(line.strip() for line in file)
-			rows = [line for line in reader]
-
+def read_rows(file, t):
+	"""Lazily splits the rest of `file` (of type `t`) into rows."""
+	if t.startswith("t/"):
+		return csv.reader(collapse_tabs(line.strip()) for line in file)
+	return csv.reader(line.strip() for line in file)
+
+def add_games(people, players, rows):
+	"""Feeds a game log (RWSE rows) into `players`, one game at a time."""
+	for r, w, b, s in rows:
+		w = people.add(w)
+		b = people.add(b)
+		s = Score.parse(s)
+		players.add_match(Match(w, b, s.score, int(r)))
+
+def parse(*paths):
+	"""Reads one table, or several game logs into the same players."""
 	people = People()
 	players = Players()
 
-	if t.endswith("RWSE"):
-		for r, w, b, s in rows:
-			w = people.add(w)
-			b = people.add(b)
-			s = Score.parse(s)
-			players.add_match(Match(w, b, s.score, int(r)))
-	elif t.endswith("#NP") or t.endswith("#N") or t.endswith("#X"):
+	for path in paths:
+		table = lib.snapshot.lookup(path)
+		if table is not None:
+			header, t, rows = table
+			if t.endswith("RWSE"):
+				add_games(people, players, rows)
+				continue
+		else:
+			with open(path, "r", encoding="utf-8") as file:
+				t = determine_csv_type(file)
+				if not t:
+					raise Exception("unknown CSV type")
+				if t.endswith("RWSE"):
+					add_games(people, players, read_rows(file, t))
+					continue
+				rows = [line for line in read_rows(file, t)]
+		if len(paths) > 1:
+			raise Exception("only game logs can be merged: %s" % path)
+		add_table(people, players, t, rows)
+
+	return people, players
+
+def add_table(people, players, t, rows):
+	"""Feeds a crosstable into `players`."""
+	if t.endswith("#NP") or t.endswith("#N") or t.endswith("#X"):
 		endcols = 0
 		if t.endswith("PP"): endcols = 2
 		elif t.endswith("P"): endcols = 1
 
-		for row in rows:
-			people.add(row[1])
+		columns = Columns(t.split("/")[-1], rows)
+		for name in columns.strings(1):
+			people.add(name)
+		# Each distinct cell text is parsed once.
+		codes, symbols, width = columns.matrix(2, len(rows[0]) - endcols)
+		scores = {}
 		indices = iter_table_indices(len(rows), len(rows[0])-endcols, 0, 2)
 		for rid, cid, i, j in indices:
-			c = rows[i][j].strip()
-			#~ print(rid, cid, "%d:%d" % (i, j), c)
-			s = Score.parse(c)
+			code = codes[i * width + j - 2]
+			#~ print(rid, cid, "%d:%d" % (i, j), symbols[code])
+			if code not in scores:
+				scores[code] = Score.parse(symbols[code])
+			s = scores[code]
 			m = Match(rid, cid, s.score)
 			players.add_match(m)
 			if s.other:
@@ -415,8 +418,6 @@ def parse(path):
 	elif t.endswith("#NGSRVPBS"):
 		raise Exception("no crosstable possible")
 
-	return people, players
-
 def empty_crosstable(pc):
 	header = ["#"]
 	for i in range(pc):
@@ -462,8 +463,18 @@ def crosstable(players, show_black=None):
 
 	return table
 
-def render(inpath):
-	people, players = parse(inpath)
+def tiebreaks(players):
+	"""Tiebreaks of `players`, indexed in their current order."""
+	index = {p.id: i for i, p in enumerate(players)}
+	results = []
+	for p in players:
+		for gg in p.games.values():
+			for g in gg:
+				results.append((index[p.id], index[g.oid], g.score))
+	return Tiebreaks.fromResults(len(index), results)
+
+def render(*inpaths):
+	people, players = parse(*inpaths)
 	players.sort_by_name(people)
 	players.sort_by_score()
 	players.update_placing()
@@ -481,11 +492,12 @@ if __name__ == "__main__":
 
 	#~ print(aa)
 	if aa.type:
-		with open(aa.file, "r", encoding="utf-8") as file:
-			print(determine_csv_type(file))
+		for path in aa.file:
+			with open(path, "r", encoding="utf-8") as file:
+				print(determine_csv_type(file))
 		exit()
 
-	people, players = parse(aa.file)
+	people, players = parse(*aa.file)
 	#~ print(people)
 
 	players.sort_by_name(people)
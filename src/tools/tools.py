@@ -1,6 +1,6 @@
-import os, sys, io, glob
+import os, sys, io, re, glob, tempfile
 import functools, contextlib
-import subprocess
+import subprocess, shlex, importlib, traceback
 import argparse
 
 class Error(Exception): pass
@@ -85,14 +85,28 @@ class ArgParserC(argparse.ArgumentParser):
 			else:
 				aa.ipaths[i] = os.path.abspath(aa.ipaths[i])
 
+UMASK = os.umask(0o022); os.umask(UMASK)
+
 @contextlib.contextmanager
 def oopen(opath=None, force=False):
+	"""Writes to `opath` through a temporary file in the same directory,
+	which replaces `opath` only if the block finishes without an error.
+	Without `opath` the output is printed at the end, and only on success.
+	"""
 	if opath:
 		if not force and os.path.exists(opath):
 			raise OverwriteError('output file exits: "%s";'
 				' delete manually (or use -f)' % opath)
-		with open(opath, "w") as ofile:
-			yield ofile
+		odir, oname = os.path.split(os.path.abspath(opath))
+		fd, tmp = tempfile.mkstemp(prefix="." + oname + ".", suffix=".tmp", dir=odir)
+		try:
+			with os.fdopen(fd, "w") as ofile:
+				yield ofile
+			os.chmod(tmp, 0o666 & ~UMASK)
+			os.replace(tmp, opath)
+		except BaseException:
+			if os.path.exists(tmp): os.remove(tmp)
+			raise
 	else:
 		ofile = io.StringIO()
 		yield ofile
@@ -107,6 +121,98 @@ def shell(cmd, encoding=None):
 		err = err.decode(encoding)
 	return out, err
 
+class Dispatcher:
+	"""Runs `python tools/<name>.py ...` and `cat ...` inside this process.
+
+	Tool modules are imported once and their `main(argv)` is called with
+	stdout and stderr captured. Everything else goes to `shell`.
+	"""
+
+	RE_META = re.compile(r'[|&;<>()$`\\*?\[\]~\n]')
+	RE_MAIN = re.compile(r'^def main\(', re.M)
+	PYTHONS = ("python", "python3")
+
+	def __init__(self, tdir=None):
+		self.tdir = os.path.abspath(tdir or os.path.dirname(__file__))
+		self.modules = {}
+		self.depth = 0
+
+	def __call__(self, cmd, encoding=None):
+		kind, argv = self.resolve(cmd)
+		if kind == "python":
+			out, err = self.call(self.module(argv[1]), argv[1:])
+			return self.encode(out, encoding), self.encode(err, encoding)
+		elif kind == "cat":
+			out, err = self.cat(argv[1:])
+			if encoding:
+				return out.decode(encoding), err
+			return out, err.encode()
+		return shell(cmd, encoding)
+
+	def resolve(self, cmd):
+		argv = self.parse(cmd)
+		if argv and argv[0] in self.PYTHONS and len(argv) > 1:
+			if self.module(argv[1]): return "python", argv
+		elif argv and argv[0] == "cat" and len(argv) > 1:
+			return "cat", argv
+		return None, argv
+
+	def parse(self, cmd):
+		if self.RE_META.search(cmd): return None
+		try: return shlex.split(cmd)
+		except ValueError: return None
+
+	def module(self, path):
+		name, ext = os.path.splitext(os.path.basename(path))
+		if ext != ".py" or not os.path.isfile(path): return None
+		if os.path.dirname(os.path.abspath(path)) != self.tdir: return None
+		if name not in self.modules:
+			self.modules[name] = self.load(name, path)
+		return self.modules[name]
+
+	def load(self, name, path):
+		# Only import scripts that have an entry point; some of the older
+		#	ones do all their work at the top level.
+		with open(path, encoding="utf-8") as file:
+			if not self.RE_MAIN.search(file.read()): return None
+		if self.tdir not in sys.path:
+			sys.path.insert(0, self.tdir)
+		with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+			try: module = importlib.import_module(name)
+			except Exception: return None
+		return module if callable(getattr(module, "main", None)) else None
+
+	def call(self, module, argv):
+		out, err = io.StringIO(), io.StringIO()
+		self.depth += 1
+		with contextlib.redirect_stdout(out), contextlib.redirect_stderr(err):
+			try: module.main(argv)
+			except SystemExit as e:
+				if e.code is not None and not isinstance(e.code, int):
+					print(e.code, file=sys.stderr)
+			except Exception:
+				traceback.print_exc()
+			finally:
+				self.depth -= 1
+		return out.getvalue(), err.getvalue()
+
+	@classmethod
+	def cat(cls, paths):
+		out, err = [], []
+		for path in paths:
+			try:
+				with open(path, "rb") as file:
+					out.append(file.read())
+			except OSError as e:
+				err.append("cat: %s: %s\n" % (path, e.strerror))
+		return b"".join(out), "".join(err)
+
+	@classmethod
+	def encode(cls, text, encoding):
+		return text if encoding else text.encode()
+
+dispatch = Dispatcher()
+
 def split(text, splitter):
 	chunks = splitter.split(text)
 	state = 0
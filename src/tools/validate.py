@@ -0,0 +1,100 @@
+"""Checks that crosstables are consistent.
+
+	python tools/validate.py [PATH...]
+
+Every #NP and #NPP table among PATH (files or directories, default
+tables/) is checked for
+	- cells off the diagonal that are no result ("1", "0.5*", "1/0", ...),
+	- results on the diagonal,
+	- games whose results do not add up to 1 (cell i,j + cell j,i),
+	- double round-robin cells ("a/b") facing a single result,
+	- a points column that is not the sum of the row.
+
+Each violation is printed as "path:line:column: message". The exit status
+is 1 if there were any.
+"""
+
+import argparse, os, sys
+
+from lib.Catalog import Catalog
+from lib.Columns import Columns
+from lib.File import File
+from lib.Tiebreaks import EMPTY, lut
+
+TYPES = ("#NP", "#NPP")
+
+def check(path):
+	"""Yields (line, column, message) for every violation in `path`."""
+	header, t, raw = File.read(path)
+	rows = File.clean(t, raw)
+	lines = [i + 2 for i, row in enumerate(raw) if row or not t.startswith("t/")]
+	t = t.split("/")[-1]
+	if t not in TYPES: return
+
+	columns = Columns(t, rows)
+	n = len(rows)
+	if not n: return
+	first, last = columns.layout["cross"]
+	codes, symbols, width = columns.matrix(first, len(rows[0]) + last)
+	if width != n:
+		yield 1, first + 1, "%d players but %d crosstable columns" % (n, width)
+		return
+
+	# One lookup per distinct cell text, then whole rows and columns of
+	#	the n x n matrices: row i is what i scored, column i what the
+	#	others scored against i.
+	games, a, b = lut(symbols)
+	G = [games[c] for c in codes]
+	A = [a[c] for c in codes]
+	B = [b[c] for c in codes]
+	text = [symbols[c] for c in codes]
+
+	for i in range(n):
+		row, col = slice(i * n, i * n + n), slice(i, n * n, n)
+		if G[i * n + i] and text[i * n + i] not in EMPTY:
+			yield lines[i], first + i + 1, "result on the diagonal: \"%s\"" % text[i * n + i]
+		for j in [j for j, g in enumerate(G[row]) if g < 0 and j != i]:
+			yield lines[i], first + j + 1, "not a result: \"%s\"" % text[i * n + j]
+
+		# Cell i,j against cell j,i for every j > i.
+		pairs = zip(range(i + 1, n), G[row][i + 1:], G[col][i + 1:], A[row][i + 1:], A[col][i + 1:],
+			B[row][i + 1:], B[col][i + 1:], text[row][i + 1:], text[col][i + 1:])
+		for j, gij, gji, aij, aji, bij, bji, tij, tji in pairs:
+			if gij < 0 or gji < 0: continue
+			where = "row %d column %d" % (lines[j], first + i + 1)
+			if gij != gji:
+				yield lines[i], first + j + 1, "\"%s\" does not pair up with \"%s\" in %s" % (tij, tji, where)
+			elif gij and (aij + aji != 1 or gij == 2 and bij + bji != 1):
+				yield lines[i], first + j + 1, "\"%s\" and \"%s\" in %s do not add up to 1" % (tij, tji, where)
+
+	try: points = columns.points
+	except ValueError as e:
+		yield lines[0], len(rows[0]) + columns.layout["points"] + 1, "points are not numbers: %s" % e
+		return
+	# Row sums, without the diagonal.
+	totals = [sum(A[i * n:i * n + n]) + sum(B[i * n:i * n + n]) - A[i * n + i] - B[i * n + i] for i in range(n)]
+	for i in [i for i in range(n) if points[i] != totals[i]]:
+		column = len(rows[i]) + columns.layout["points"] + 1
+		yield lines[i], column, "points %g, but the results add up to %g" % (points[i], totals[i])
+
+def paths(args):
+	for arg in args:
+		if os.path.isdir(arg):
+			entries = Catalog.open(arg)
+			yield from sorted(e.path for e in entries if e.type.split("/")[-1] in TYPES)
+		else:
+			yield arg
+
+def main(argv=sys.argv):
+	p = argparse.ArgumentParser()
+	p.add_argument("paths", nargs="*", metavar="PATH", default=["tables"])
+	aa = p.parse_args(argv[1:])
+	count = 0
+	for path in paths(aa.paths):
+		for line, column, message in check(path):
+			print("%s:%d:%d: %s" % (path, line, column, message))
+			count += 1
+	return 1 if count else 0
+
+if __name__ == "__main__":
+	sys.exit(main())
@@ -1,4 +1,6 @@
-import argparse, collections, glob, io, os, re, sys
+import argparse, collections, fnmatch, glob, io, os, re, sys
+
+from lib.Catalog import Catalog
 
 Path = collections.namedtuple("Path", "text root type year month extra_")
 Path.re = re.compile(r"(.*?/)(blitz|schnell|gp)-(\d+)-(\d+)(-.*?)?\.csv")
@@ -219,17 +221,21 @@ def blah(pp, gg, pokal=None):
 
 	return s.getvalue()
 
+def list_tables(tdir):
+	return [os.path.relpath(e.path, tdir) for e in Catalog.open(tdir)]
+
 def find_bs(tdir, year):
 	assert year, "need --year, use --list to get a list of options"
 	regex = re.compile(r'(blitz|schnell)-(%02d)-(\d+)(-games.*?)?(\.csv)' % year)
-	nn = os.listdir(tdir)
+	nn = list_tables(tdir)
 	nn = (regex.match(n) for n in nn)
 	nn = (os.path.join(tdir, n.group(0)) for n in nn if n)
 	return sorted(Path.parse(n) for n in nn)
 
 def find_gp(tdir, year):
 	assert year, "need --year, use --list to get a list of options"
-	nn = glob.glob(os.path.join(tdir, "gp-%02d-??.csv" % year))
+	nn = fnmatch.filter(list_tables(tdir), "gp-%02d-??.csv" % year)
+	nn = (os.path.join(tdir, n) for n in nn)
 	return sorted(Path.parse(n) for n in nn)
 
 def find_po(pdir, year):
@@ -244,7 +250,7 @@ def find_me(pdir, year):
 
 def find_years(aa):
 	regex = re.compile(r'(blitz|schnell)-(\d+)-(\d+)(-games.*?)?(\.csv)')
-	nn = os.listdir(aa.tdir)
+	nn = list_tables(aa.tdir)
 	nn = (regex.match(n) for n in nn)
 	nn = (n for n in nn if n)
 	yy = set()
@@ -253,9 +259,10 @@ def find_years(aa):
 		yy.add(y)
 	return yy
 
-if __name__ == "__main__":
-	parser, aa = parse_args()
+def main(argv=sys.argv):
+	parser, aa = parse_args(argv[1:])
 	# print(aa)
+	Catalog.open(aa.tdir, refresh=True)
 
 	if aa.list:
 		if aa.year:
@@ -267,11 +274,11 @@ if __name__ == "__main__":
 			print('\n'.join(pp))
 		else:
 			print(' '.join(str(x) for x in sorted(find_years(aa))))
-		exit()
+		return
 
 	if aa.index:
-		write_index(aa)
-		exit()
+		write_index(aa, file = sys.stdout)
+		return
 
 	pp = find_bs(aa.tdir, aa.year)
 	#~ for p in pp: print(p, p.path)
@@ -289,3 +296,6 @@ if __name__ == "__main__":
 	else:
 		with open(aa.ofile, "w", encoding="utf8") as file:
 			file.write(out)
+
+if __name__ == "__main__":
+	main()